@@ -0,0 +1,100 @@
+"""End-to-end POST /recommendations timings against the fake upstream.
+
+Runs the FastAPI app in-process and points the Spoonacular client at a local
+FakeSpoonacular, so the numbers cover fetch + filter + rank + enrichment with
+a known, configurable upstream latency.
+
+    python -m benchmarks.bench_e2e [--latency-ms 80] [--requests 20]
+"""
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_upstream import FakeSpoonacular
+from benchmarks.synthetic import make_pantry
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _summary(samples):
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": _percentile(samples, 50),
+        "p95": _percentile(samples, 95),
+    }
+
+
+def run(latency=0.08, n_requests=20, concurrency=8, top_n=5):
+    """Latency summaries (seconds) keyed "e2e/<scenario>/<stat>"."""
+    upstream = FakeSpoonacular(latency=latency, jitter=latency / 4).start()
+    # BASE_URL is read at import, so the service modules are imported only once it is set
+    os.environ["SPOONACULAR_BASE_URL"] = upstream.base_url
+    # the fake upstream is free, so don't let the quota limiter pace it
+    os.environ.setdefault("SPOONACULAR_DAILY_POINTS", "1e9")
+    os.environ.setdefault("SPOONACULAR_RATE_PER_SECOND", "1e6")
+    os.environ.setdefault("SPOONACULAR_RATE_BURST", "1e6")
+    from fastapi.testclient import TestClient
+    from service.external.spoonacular_api import instruction_store, search_cache
+    from service.main import app
+
+    client = TestClient(app)
+    bodies = [{"ingredients": make_pantry(seed=i), "top_n": top_n, "use_cache": False} for i in range(n_requests)]
+
+    def clear_caches():
+        search_cache.clear()
+        instruction_store.clear()
+
+    def timed_post(body):
+        start = time.perf_counter()
+        response = client.post("/recommendations", json=body)
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    results = {}
+    try:
+        cold = []
+        for body in bodies:
+            clear_caches()
+            cold.append(timed_post(body))
+
+        # fill the caches, then time requests whose searches and instructions are all cached
+        warm_bodies = [{**body, "use_cache": True} for body in bodies]
+        for body in warm_bodies:
+            timed_post(body)
+        warm = [timed_post(body) for body in warm_bodies]
+
+        clear_caches()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            concurrent = list(pool.map(timed_post, bodies))
+        wall = time.perf_counter() - start
+    finally:
+        upstream.stop()
+        clear_caches()
+
+    for scenario, samples in (("cold", cold), ("warm", warm), (f"concurrent{concurrency}", concurrent)):
+        for stat, seconds in _summary(samples).items():
+            results[f"e2e/{scenario}/{stat}"] = seconds
+    results[f"e2e/concurrent{concurrency}/requests_per_second"] = len(bodies) / wall
+    results["e2e/upstream_requests"] = upstream.requests
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time POST /recommendations against a fake upstream.")
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    for name, value in run(args.latency_ms / 1000, args.requests, args.concurrency).items():
+        print(f"{name:<36} {value:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
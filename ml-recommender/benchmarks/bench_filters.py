@@ -0,0 +1,64 @@
+"""Microbenchmark: filter cost vs. number of recipes and restrictions.
+
+Compares the compiled RestrictionMatcher against the previous per-recipe
+nested substring loops.
+
+    python -m benchmarks.bench_filters
+"""
+import random
+import timeit
+
+from logic.filters import INTOLERANCE_KEYWORDS, filter_recipes
+from logic.ingredients import get_ingredients
+
+INGREDIENTS = [
+    "chicken breast", "brown rice", "olive oil", "garlic", "yellow onion", "salt", "black pepper",
+    "egg", "all purpose flour", "whole milk", "butter", "parmesan cheese", "soy sauce", "tofu",
+    "shrimp", "salmon", "almonds", "sesame oil", "tomato", "basil", "lemon juice", "honey",
+]
+RECIPE_COUNTS = [100, 1000, 10000]
+RESTRICTION_COUNTS = [1, 4, 8, len(INTOLERANCE_KEYWORDS)]
+
+
+def make_recipes(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {"id": i, "extendedIngredients": [{"name": name} for name in rng.sample(INGREDIENTS, rng.randint(3, 12))]}
+        for i in range(n)
+    ]
+
+
+def legacy_filter(recipes, restrictions):
+    def banned(recipe, words):
+        return any(any(w in ingredient for w in words) for ingredient in get_ingredients(recipe))
+
+    filtered = recipes
+    for intolerance in restrictions.get("intolerances", []):
+        filtered = [r for r in filtered if not banned(r, INTOLERANCE_KEYWORDS.get(intolerance, [intolerance]))]
+    excluded = restrictions.get("excluded_ingredients", [])
+    if excluded:
+        filtered = [r for r in filtered if not banned(r, excluded)]
+    return filtered
+
+
+def run(repeat=3):
+    intolerances = list(INTOLERANCE_KEYWORDS)
+    rows = []
+    for n_recipes in RECIPE_COUNTS:
+        recipes = make_recipes(n_recipes)
+        for n_restrictions in RESTRICTION_COUNTS:
+            restrictions = {
+                "intolerances": intolerances[:n_restrictions],
+                "excluded_ingredients": ["cilantro", "mushroom"],
+            }
+            assert filter_recipes(recipes, restrictions) == legacy_filter(recipes, restrictions)
+            legacy = min(timeit.repeat(lambda: legacy_filter(recipes, restrictions), number=1, repeat=repeat))
+            compiled = min(timeit.repeat(lambda: filter_recipes(recipes, restrictions), number=1, repeat=repeat))
+            rows.append((n_recipes, n_restrictions, legacy, compiled))
+    return rows
+
+
+if __name__ == "__main__":
+    print(f"{'recipes':>8} {'restrictions':>12} {'legacy ms':>10} {'compiled ms':>12} {'speedup':>8}")
+    for n_recipes, n_restrictions, legacy, compiled in run():
+        print(f"{n_recipes:>8} {n_restrictions:>12} {legacy * 1000:>10.2f} {compiled * 1000:>12.2f} {legacy / compiled:>7.1f}x")
@@ -0,0 +1,72 @@
+"""Microbenchmarks for the pipeline stages in `utils/` and `logic/` across candidate counts.
+
+    python -m benchmarks.bench_logic [--max-recipes 10000]
+"""
+import argparse
+import timeit
+
+from benchmarks.synthetic import make_pantry, make_recipes
+from logic.filters import filter_recipes, validate_restrictions
+from logic.recipe_view import build_views
+from logic.scorer import rank_recipes
+from utils.canonical import canonical_ingredient
+from utils.preprocessing import normalize_ingredients
+
+RECIPE_COUNTS = [10, 100, 1000, 10000, 100000]
+RAW_RESTRICTIONS = {
+    "diet": ["Vegetarian ", "gluten free", "carnivore"],
+    "intolerances": ["Peanut", "shellfish", "dairy"],
+    "excluded_ingredients": [" Cilantro", "mushroom"],
+}
+
+
+def _best(fn, repeat, number=1):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def _normalize_cold(lines):
+    # canonical names are memoized; clear them so every repeat cleans each line from scratch
+    canonical_ingredient.cache_clear()
+    return normalize_ingredients(lines)
+
+
+def bench_stages(n_recipes, repeat=3, seed=0):
+    pantry = make_pantry(seed=seed)
+    recipes = make_recipes(n_recipes, seed=seed, pantry=pantry)
+    # normalize every ingredient line in the candidate set, the worst case for the pantry cleaner
+    ingredient_lines = [i["name"].title() + "!" for r in recipes for i in r["extendedIngredients"]]
+    restrictions = validate_restrictions(RAW_RESTRICTIONS)
+
+    return {
+        "normalize_ingredients": _best(lambda: _normalize_cold(ingredient_lines), repeat),
+        "normalize_ingredients_warm": _best(lambda: normalize_ingredients(ingredient_lines), repeat),
+        "validate_restrictions": _best(lambda: validate_restrictions(RAW_RESTRICTIONS), repeat, number=100),
+        "build_views": _best(lambda: build_views(recipes), repeat),
+        "filter_recipes": _best(lambda: filter_recipes(recipes, restrictions), repeat),
+        "rank_recipes": _best(lambda: rank_recipes(recipes, pantry), repeat),
+        "rank_recipes_top5": _best(lambda: rank_recipes(recipes, pantry, top_n=5), repeat),
+    }
+
+
+def run(recipe_counts=RECIPE_COUNTS, repeat=3):
+    """Seconds per call, keyed "<stage>/<recipes>"."""
+    results = {}
+    for n_recipes in recipe_counts:
+        for stage, seconds in bench_stages(n_recipes, repeat).items():
+            results[f"{stage}/{n_recipes}"] = seconds
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the recommendation pipeline stages.")
+    parser.add_argument("--max-recipes", type=int, default=RECIPE_COUNTS[-1])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    counts = [n for n in RECIPE_COUNTS if n <= args.max_recipes]
+    for name, seconds in run(counts, args.repeat).items():
+        print(f"{name:<32} {seconds * 1000:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Speed and recall of LSH candidate generation in the recipe corpus, across band/row settings.
+
+For each setting, a query is timed end to end (LSH lookup plus exact
+re-scoring) against the exact inverted-index search. Recall@k is the
+share of the returned top k that score at least as well as the k-th best
+recipe of an exact ranking over the whole corpus, so ties don't count as misses.
+
+    python -m benchmarks.bench_lsh [--recipes 50000]
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import make_pantry, make_recipes
+from logic.scorer import rank_recipes
+from service.corpus import RecipeCorpus, pantry_terms
+from utils.preprocessing import normalize_ingredients
+
+# (bands, rows)
+SETTINGS = [(16, 2), (32, 2), (64, 2), (32, 3), (64, 3)]
+N_PANTRIES = 10
+K = 10
+
+
+def _score_map(recipes, pantry):
+    return {entry["recipe"]["id"]: entry["score"] for entry in rank_recipes(recipes, pantry)}
+
+
+def bench_setting(recipes, pantries, bands, rows, k=K):
+    corpus = RecipeCorpus(lsh_bands=bands, lsh_rows=rows)
+    for recipe in recipes:
+        corpus.add(recipe)
+    start = time.perf_counter()
+    corpus.lsh
+    build = time.perf_counter() - start
+    # views are cached by the corpus after a recipe's first query; time the warm path
+    for recipe_id in corpus.recipes:
+        corpus.view(recipe_id)
+
+    query_seconds = exact_seconds = candidate_share = recall = 0.0
+    for pantry in pantries:
+        start = time.perf_counter()
+        approximate = corpus.approximate_candidates(pantry, k)
+        query_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        corpus.candidates(pantry, k)
+        exact_seconds += time.perf_counter() - start
+
+        scores = _score_map(recipes, pantry)
+        kth_best = sorted(scores.values(), reverse=True)[k - 1]
+        recall += sum(scores[r["id"]] >= kth_best for r in approximate) / k
+        candidate_share += len(corpus.lsh.query(pantry_terms(pantry))) / len(recipes)
+
+    n = len(pantries)
+    prefix = f"lsh/b{bands}r{rows}/{len(recipes)}"
+    return {
+        f"{prefix}/build": build,
+        f"{prefix}/query": query_seconds / n,
+        f"{prefix}/index_query": exact_seconds / n,
+        f"{prefix}/candidate_share": candidate_share / n,
+        f"{prefix}/recall_at_{k}": recall / n,
+    }
+
+
+def run(n_recipes=10000, settings=SETTINGS, n_pantries=N_PANTRIES):
+    recipes = make_recipes(n_recipes, seed=0)
+    pantries = [normalize_ingredients(make_pantry(seed=seed)) for seed in range(n_pantries)]
+    results = {}
+    for bands, rows in settings:
+        results.update(bench_setting(recipes, pantries, bands, rows))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time LSH candidate generation and measure its recall.")
+    parser.add_argument("--recipes", type=int, default=10000)
+    parser.add_argument("--pantries", type=int, default=N_PANTRIES)
+    args = parser.parse_args(argv)
+
+    for name, value in run(args.recipes, n_pantries=args.pantries).items():
+        if name.endswith(("candidate_share", f"recall_at_{K}")):
+            print(f"{name:<40} {value:>10.3f}")
+        else:
+            print(f"{name:<40} {value * 1000:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compare the ranking engines in `logic/scorer.py` on latency and ranking quality.
+
+Quality is judged on synthetic data: every synthetic recipe is built around one
+protein (its first ingredient), and a recipe counts as relevant when the pantry
+has that protein. Precision@k is the share of relevant recipes in the top k,
+averaged over many seeded pantries.
+
+    python -m benchmarks.bench_rankers [--max-recipes 10000]
+"""
+import argparse
+import timeit
+
+from benchmarks.synthetic import PROTEINS, make_pantry, make_recipes
+from logic.scorer import RANKERS, rank_recipes
+
+RECIPE_COUNTS = [100, 1000, 10000, 100000]
+QUALITY_RECIPES = 2000
+QUALITY_PANTRIES = 50
+K = 10
+
+
+def _best(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def bench_latency(n_recipes, repeat=3, seed=0):
+    pantry = make_pantry(seed=seed)
+    recipes = make_recipes(n_recipes, seed=seed, pantry=pantry)
+    return {ranker: _best(lambda: rank_recipes(recipes, pantry, top_n=K, ranker=ranker), repeat) for ranker in RANKERS}
+
+
+def is_relevant(recipe, pantry):
+    return recipe["extendedIngredients"][0]["name"] in pantry
+
+
+def bench_quality(n_recipes=QUALITY_RECIPES, n_pantries=QUALITY_PANTRIES, k=K):
+    """Mean precision@k per ranker, and how much the rankers' top k overlap."""
+    precision = {ranker: 0.0 for ranker in RANKERS}
+    overlap = 0.0
+    judged = 0
+    for seed in range(n_pantries):
+        pantry = make_pantry(seed=seed)
+        # a pantry without a protein has no relevant recipes to find
+        if not any(p in PROTEINS for p in pantry):
+            continue
+        recipes = make_recipes(n_recipes, seed=seed, pantry=pantry)
+        top = {}
+        for ranker in RANKERS:
+            ranked = [entry["recipe"] for entry in rank_recipes(recipes, pantry, top_n=k, ranker=ranker)]
+            precision[ranker] += sum(is_relevant(r, pantry) for r in ranked) / k
+            top[ranker] = {r["id"] for r in ranked}
+        overlap += len(set.intersection(*top.values())) / k
+        judged += 1
+
+    results = {f"rankers/{ranker}/precision_at_{k}": total / judged for ranker, total in precision.items()}
+    results[f"rankers/overlap_at_{k}"] = overlap / judged
+    return results
+
+
+def run(recipe_counts=RECIPE_COUNTS, repeat=3):
+    """Seconds per top-k ranking keyed "rankers/<ranker>/<recipes>", plus the quality measurements."""
+    results = {}
+    for n_recipes in recipe_counts:
+        for ranker, seconds in bench_latency(n_recipes, repeat).items():
+            results[f"rankers/{ranker}/{n_recipes}"] = seconds
+    results.update(bench_quality())
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the ranking engines.")
+    parser.add_argument("--max-recipes", type=int, default=RECIPE_COUNTS[-1])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    counts = [n for n in RECIPE_COUNTS if n <= args.max_recipes]
+    for name, value in run(counts, args.repeat).items():
+        if "_at_" in name:
+            print(f"{name:<40} {value:>10.3f}")
+        else:
+            print(f"{name:<40} {value * 1000:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
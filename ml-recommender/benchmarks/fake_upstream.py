@@ -0,0 +1,101 @@
+"""A local stand-in for the Spoonacular endpoints the service calls, with configurable latency.
+
+Serves complexSearch, informationBulk and analyzedInstructions from the synthetic generator, so
+end-to-end timings measure this service rather than the internet.
+
+    python -m benchmarks.fake_upstream --port 8081 --latency-ms 80
+    SPOONACULAR_BASE_URL=http://127.0.0.1:8081 uvicorn service.main:app
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import make_instructions, make_recipe
+
+INSTRUCTIONS_PATH = re.compile(r"^/recipes/(\d+)/analyzedInstructions$")
+
+
+class FakeSpoonacular(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.0, jitter=0.0, seed=0):
+        super().__init__(address, FakeSpoonacularHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.seed = seed
+        self.requests = 0
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name="fake-spoonacular", daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeSpoonacularHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        time.sleep(max(0.0, server.latency + random.uniform(-server.jitter, server.jitter)))
+
+        if url.path == "/recipes/complexSearch":
+            pantry = [i for i in query.get("includeIngredients", "").split(",") if i]
+            # same query, same results, like the real API
+            rng = random.Random(f"{server.seed}:{url.query}")
+            results = [make_recipe(rng, rng.randrange(1, 10 ** 6), pantry) for _ in range(int(query.get("number", 10)))]
+            self._send({"results": results, "offset": 0, "number": len(results), "totalResults": len(results)})
+            return
+
+        if url.path == "/recipes/informationBulk":
+            ids = [int(i) for i in query.get("ids", "").split(",") if i]
+            self._send([{"id": i, "analyzedInstructions": make_instructions(i, server.seed)} for i in ids])
+            return
+
+        match = INSTRUCTIONS_PATH.match(url.path)
+        if match:
+            self._send(make_instructions(int(match.group(1)), server.seed))
+            return
+
+        self._send({"status": "failure", "code": 404}, status=404)
+
+    def _send(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a fake Spoonacular API.")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    args = parser.parse_args(argv)
+
+    server = FakeSpoonacular(("127.0.0.1", args.port), args.latency_ms / 1000, args.jitter_ms / 1000)
+    print(f"Fake Spoonacular on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
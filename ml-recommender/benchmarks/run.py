@@ -0,0 +1,103 @@
+"""Run the benchmark suite, save the results as JSON and compare them with the previous run.
+
+    python -m benchmarks.run                      # full run, 10..100k recipes
+    python -m benchmarks.run --quick              # small sizes, for a quick sanity check
+    python -m benchmarks.run --baseline old.json  # compare against a specific run
+
+The previous results file is the default baseline, so running the suite before
+and after a change prints the change for every measurement.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from benchmarks import bench_e2e, bench_logic, bench_rankers
+
+RESULTS_PATH = os.getenv(
+    "BENCHMARK_RESULTS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.json")
+)
+# changes smaller than this are reported as noise
+NOISE_THRESHOLD = 0.05
+# every other measurement is a time, where lower is better
+HIGHER_IS_BETTER = ("requests_per_second", "precision_at_10", "overlap_at_10")
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_results(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def compare(current, baseline):
+    """(name, baseline value, current value, relative change) for every measurement in both runs."""
+    rows = []
+    for name, value in current.items():
+        before = baseline.get(name)
+        if before:
+            rows.append((name, before, value, (value - before) / before))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the recommendation pipeline benchmarks.")
+    parser.add_argument("--output", default=RESULTS_PATH, help="results file (default: %(default)s)")
+    parser.add_argument("--baseline", help="results file to compare with (default: the previous --output)")
+    parser.add_argument("--quick", action="store_true", help="only run up to 1000 recipes and 5 e2e requests")
+    parser.add_argument("--latency-ms", type=float, default=80, help="fake upstream latency")
+    parser.add_argument("--skip-e2e", action="store_true")
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.baseline or args.output)
+
+    max_recipes = 1000 if args.quick else bench_logic.RECIPE_COUNTS[-1]
+    results = bench_logic.run([n for n in bench_logic.RECIPE_COUNTS if n <= max_recipes])
+    results.update(bench_rankers.run([n for n in bench_rankers.RECIPE_COUNTS if n <= max_recipes]))
+    if not args.skip_e2e:
+        results.update(bench_e2e.run(args.latency_ms / 1000, n_requests=5 if args.quick else 20))
+
+    run = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "quick": args.quick,
+            "latency_ms": args.latency_ms,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(run, f, indent=2, sort_keys=True)
+
+    if not baseline:
+        for name, value in results.items():
+            print(f"{name:<40} {value:>12.6f}")
+        print(f"\nSaved {len(results)} results to {args.output} (no previous run to compare with)")
+        return 0
+
+    print(f"Compared with {baseline['meta'].get('revision')} from {baseline['meta'].get('created')}")
+    print(f"{'benchmark':<40} {'before':>12} {'after':>12} {'change':>8}")
+    for name, before, after, change in compare(results, baseline["results"]):
+        improved = (change > 0) == name.endswith(HIGHER_IS_BETTER)
+        flag = "" if abs(change) < NOISE_THRESHOLD else ("  better" if improved else "  worse")
+        print(f"{name:<40} {before:>12.6f} {after:>12.6f} {change:>+7.1%}{flag}")
+    print(f"\nSaved {len(results)} results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
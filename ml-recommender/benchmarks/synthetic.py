@@ -0,0 +1,72 @@
+"""Seeded synthetic recipes and pantries shaped like Spoonacular complexSearch results.
+
+The same seed always produces the same data, so benchmark runs are comparable.
+"""
+import random
+
+PROTEINS = ["chicken breast", "ground beef", "pork loin", "salmon", "shrimp", "tofu", "egg", "chickpeas",
+            "black beans", "lentils", "turkey", "cod"]
+PRODUCE = ["yellow onion", "garlic", "tomato", "carrot", "celery", "bell pepper", "spinach", "broccoli",
+           "zucchini", "mushroom", "potato", "sweet potato", "lemon", "lime", "cilantro", "basil",
+           "ginger", "green onion", "avocado", "cucumber"]
+PANTRY_STAPLES = ["olive oil", "salt", "black pepper", "all purpose flour", "sugar", "butter", "whole milk",
+                  "soy sauce", "rice", "pasta", "parmesan cheese", "honey", "sesame oil", "peanut butter",
+                  "almonds", "vinegar", "chicken broth", "cumin", "paprika", "oregano"]
+INGREDIENTS = PROTEINS + PRODUCE + PANTRY_STAPLES
+ADJECTIVES = ["Quick", "Spicy", "Creamy", "Roasted", "Weeknight", "Crispy", "Lemony", "Smoky", "One-Pan"]
+DISHES = ["Skillet", "Stir Fry", "Bowl", "Curry", "Pasta", "Salad", "Soup", "Tacos", "Casserole", "Wrap"]
+# complexSearch boolean diet fields and the probability a recipe has each
+DIET_FLAGS = {"vegetarian": 0.3, "vegan": 0.1, "glutenFree": 0.35, "dairyFree": 0.4, "ketogenic": 0.05}
+DIET_NAMES = {"vegetarian": "lacto ovo vegetarian", "vegan": "vegan", "glutenFree": "gluten free",
+              "dairyFree": "dairy free", "ketogenic": "ketogenic"}
+
+
+def make_recipe(rng, recipe_id, pantry=()):
+    names = [rng.choice(PROTEINS)] + rng.sample(PRODUCE + PANTRY_STAPLES, rng.randint(3, 14))
+    names = list(dict.fromkeys(names))
+    flags = {field: rng.random() < p for field, p in DIET_FLAGS.items()}
+
+    used = [n for n in names if any(p in n for p in pantry)]
+    missed = [n for n in names if n not in used]
+    return {
+        "id": recipe_id,
+        "title": f"{rng.choice(ADJECTIVES)} {names[0].title()} {rng.choice(DISHES)}",
+        "image": f"https://img.example.com/recipes/{recipe_id}-312x231.jpg",
+        "extendedIngredients": [{"id": INGREDIENTS.index(n), "name": n, "amount": rng.randint(1, 4)} for n in names],
+        "usedIngredients": [{"name": n} for n in used],
+        "missedIngredients": [{"name": n} for n in missed],
+        "usedIngredientCount": len(used),
+        "missedIngredientCount": len(missed),
+        "diets": [DIET_NAMES[f] for f, on in flags.items() if on],
+        **flags,
+    }
+
+
+def make_recipes(n, seed=0, pantry=()):
+    rng = random.Random(seed)
+    return [make_recipe(rng, 100000 + i, pantry) for i in range(n)]
+
+
+def make_pantry(size=8, seed=0):
+    rng = random.Random(seed)
+    return rng.sample(INGREDIENTS, size)
+
+
+def make_instructions(recipe_id, seed=0):
+    """analyzedInstructions payload for a recipe."""
+    rng = random.Random(seed * 1000003 + recipe_id)
+    steps = [
+        {
+            "number": i + 1,
+            "step": f"Step {i + 1}: {rng.choice(['Chop', 'Stir', 'Simmer', 'Season', 'Bake'])} "
+                    f"the {rng.choice(INGREDIENTS)}.",
+            "ingredients": [{"name": rng.choice(INGREDIENTS)}],
+            "equipment": [{"name": rng.choice(["pan", "pot", "oven", "bowl"])}],
+            "length": {"number": rng.randint(2, 30), "unit": "minutes"} if rng.random() < 0.5 else None,
+        }
+        for i in range(rng.randint(3, 9))
+    ]
+    for step in steps:
+        if step["length"] is None:
+            del step["length"]
+    return [{"name": "", "steps": steps}]
@@ -1,87 +1,124 @@
-from logic.ingredients import get_ingredients
+import re
+from functools import lru_cache
+
+from logic.recipe_view import DIET_BITS, as_view, diets_mask
+from utils.canonical import canonical_ingredient
+
+INTOLERANCE_KEYWORDS = {
+    'dairy': ['milk', 'cheese', 'butter', 'cream', 'yogurt', 'whey', 'casein'],
+    'egg': ['egg', 'mayonnaise'],
+    'gluten': ['wheat', 'flour', 'gluten', 'barley', 'rye', 'bread', 'pasta'],
+    'grain': ['wheat', 'rice', 'oat', 'barley', 'corn', 'quinoa'],
+    'peanut': ['peanut'],
+    'soy': ['soy', 'tofu', 'edamame', 'tempeh'],
+    'shellfish': ['shrimp', 'crab', 'lobster', 'prawn', 'crayfish'],
+    'seafood': ['fish', 'salmon', 'tuna', 'cod', 'tilapia'],
+    'tree nut': ['almond', 'walnut', 'pecan', 'cashew', 'pistachio', 'hazelnut'],
+    'nuts': ['almond', 'walnut', 'pecan', 'cashew', 'pistachio', 'hazelnut', 'nut'],
+    'sesame': ['sesame', 'tahini'],
+    'sulfite': ['sulfite'],
+    'wheat': ['wheat', 'flour'],
+}
+
+@lru_cache(maxsize=256)
+def _compile_words(words):
+    """One regex that finds any of `words` as a substring, or None if there are no words."""
+    if not words:
+        return None
+    alternatives = sorted(set(words), key=len, reverse=True)
+    return re.compile('|'.join(re.escape(w) for w in alternatives))
+
+
+def _mentions(pattern, view):
+    return bool(view.ingredients) and pattern.search(view.joined) is not None
+
+
+def _diet_list(diet):
+    diets = [diet] if isinstance(diet, str) else diet or []
+    return [d.lower().strip() for d in diets]
+
+
+def intolerance_words(intolerances):
+    words = []
+    for intolerance in intolerances:
+        intolerance = intolerance.lower().strip()
+        words.extend(INTOLERANCE_KEYWORDS.get(intolerance, [intolerance]))
+    return words
+
+
+def excluded_words(excluded):
+    # "-" or a non-Latin name canonicalizes to "", which would match every recipe
+    return [w for w in (canonical_ingredient(e) for e in excluded) if w]
+
+
+class RestrictionMatcher:
+    """Validated restrictions compiled once per request and reused for every candidate recipe."""
+
+    def __init__(self, user_restrictions):
+        diets = _diet_list(user_restrictions.get('diet'))
+        self.has_diet = bool(diets)
+        self.diet_mask = diets_mask(diets)
+        # diets without a flag bit can still be matched against the recipe's own `diets` list
+        self.other_diets = frozenset(d for d in diets if d not in DIET_BITS)
+
+        banned = intolerance_words(user_restrictions.get('intolerances') or [])
+        banned += excluded_words(user_restrictions.get('excluded_ingredients') or [])
+        self.banned = _compile_words(tuple(banned))
+
+    def allows(self, view):
+        if self.has_diet and not (view.diet_mask & self.diet_mask or view.diet_names & self.other_diets):
+            return False
+        if self.banned is not None and _mentions(self.banned, view):
+            return False
+        return True
+
+    def mask(self, recipes):
+        """Whether each recipe (dict or RecipeView) is allowed, or None when nothing is restricted."""
+        if not self.has_diet and self.banned is None:
+            return None
+        return [self.allows(as_view(r)) for r in recipes]
+
+
+def compile_restrictions(user_restrictions):
+    return RestrictionMatcher(user_restrictions)
+
 
 def filter_recipes(recipes, user_restrictions):
+    """Keep the recipes (dicts or RecipeViews) that satisfy the restrictions."""
+    if isinstance(user_restrictions, RestrictionMatcher):
+        matcher = user_restrictions
+    else:
+        matcher = compile_restrictions(user_restrictions)
 
-    filtered = recipes
-    
-    if user_restrictions.get('diet'):
-        filtered = [r for r in filtered if meets_diet(r, user_restrictions['diet'])]
-    
-    if user_restrictions.get('intolerances'):
-        filtered = [r for r in filtered if not has_intolerance(r, user_restrictions['intolerances'])]
-    
-    if user_restrictions.get('excluded_ingredients'):
-        filtered = [r for r in filtered if not has_excluded(r, user_restrictions['excluded_ingredients'])]
-    
-    return filtered
+    if not matcher.has_diet and matcher.banned is None:
+        return recipes
+    return [r for r in recipes if matcher.allows(as_view(r))]
 
 
 def meets_diet(recipe, diet):
-    diets = [diet] if isinstance(diet, str) else diet
-    diets = [d.lower().strip() for d in diets]
-    
+    diets = _diet_list(diet)
+
     if not diets:
         return True
-    
-    diet_fields = {
-        'vegetarian': recipe.get('vegetarian', False),
-        'vegan': recipe.get('vegan', False),
-        'gluten free': recipe.get('glutenFree', False),
-        'ketogenic': recipe.get('ketogenic', False),
-        'dairy free': recipe.get('dairyFree', False),
-        'paleo': recipe.get('paleo', False),
-        'pescatarian': recipe.get('pescatarian', False),
-        'primal': recipe.get('primal', False),
-        'whole30': recipe.get('whole30', False),
-        'low fodmap': recipe.get('lowFodmap', False),
-    }
-    
-    if 'diets' in recipe:
-        recipe_diets = [d.lower() for d in recipe['diets']]
-        if any(diet in recipe_diets for diet in diets):
-            return True
-    
-    return any(diet_fields.get(diet, False) for diet in diets)
+
+    view = as_view(recipe)
+    if view.diet_mask & diets_mask(diets):
+        return True
+    return any(d in view.diet_names for d in diets)
 
 
 def has_intolerance(recipe, intolerances):
-    ingredients = get_ingredients(recipe)
-    intolerances = [i.lower().strip() for i in intolerances]
-    
-    keywords = {
-        'dairy': ['milk', 'cheese', 'butter', 'cream', 'yogurt', 'whey', 'casein'],
-        'egg': ['egg', 'mayonnaise'],
-        'gluten': ['wheat', 'flour', 'gluten', 'barley', 'rye', 'bread', 'pasta'],
-        'grain': ['wheat', 'rice', 'oat', 'barley', 'corn', 'quinoa'],
-        'peanut': ['peanut'],
-        'soy': ['soy', 'tofu', 'edamame', 'tempeh'],
-        'shellfish': ['shrimp', 'crab', 'lobster', 'prawn', 'crayfish'],
-        'seafood': ['fish', 'salmon', 'tuna', 'cod', 'tilapia'],
-        'tree nut': ['almond', 'walnut', 'pecan', 'cashew', 'pistachio', 'hazelnut'],
-        'nuts': ['almond', 'walnut', 'pecan', 'cashew', 'pistachio', 'hazelnut', 'nut'],
-        'sesame': ['sesame', 'tahini'],
-        'sulfite': ['sulfite'],
-        'wheat': ['wheat', 'flour'],
-    }
-    
-    for intolerance in intolerances:
-        words = keywords.get(intolerance, [intolerance])
-        for ingredient in ingredients:
-            if any(word in ingredient for word in words):
-                return True
-    
-    return False
+    pattern = _compile_words(tuple(intolerance_words(intolerances)))
+    if pattern is None:
+        return False
+    return _mentions(pattern, as_view(recipe))
 
 
 def has_excluded(recipe, excluded):
-    ingredients = get_ingredients(recipe)
-    excluded = [e.lower().strip() for e in excluded]
-    
-    for ingredient in ingredients:
-        if any(ex in ingredient for ex in excluded):
-            return True
-    
-    return False
+    pattern = _compile_words(tuple(excluded_words(excluded)))
+    if pattern is None:
+        return False
+    return _mentions(pattern, as_view(recipe))
 
 def validate_restrictions(restrictions):
     valid = {}
@@ -96,7 +133,6 @@ def validate_restrictions(restrictions):
         'dairy', 'egg', 'gluten', 'grain', 'peanut', 'seafood',
         'sesame', 'shellfish', 'soy', 'sulfite', 'tree nut', 'wheat', 'nuts'
     ]
-    print(1)
     if 'diet' in restrictions and restrictions['diet']:
         diet = restrictions['diet']
         if isinstance(diet, str):
@@ -105,16 +141,13 @@ def validate_restrictions(restrictions):
                 valid['diet'] = diet
         elif isinstance(diet, list):
             valid['diet'] = [d.lower().strip() for d in diet if d.lower().strip() in valid_diets]
-    print(2)
     if 'intolerances' in restrictions and restrictions['intolerances']:
         intolerances = restrictions['intolerances']
         if isinstance(intolerances, list):
             valid['intolerances'] = [i.lower().strip() for i in intolerances 
                                     if i.lower().strip() in valid_intolerances]
-    print(3)
     if 'excluded_ingredients' in restrictions and restrictions['excluded_ingredients']:
         excluded = restrictions['excluded_ingredients']
         if isinstance(excluded, list):
             valid['excluded_ingredients'] = [e.strip() for e in excluded if e.strip()]
-    print(4)
     return valid
\ No newline at end of file
@@ -15,5 +15,12 @@ def get_ingredients(recipe):
                 name = ing.get('name') or ing.get('originalName') or ing.get('original', '')
                 if name:
                     ingredients.append(name.lower())
+
+    else:
+        # complexSearch results without recipe information only carry the pantry split
+        for ing in (recipe.get('usedIngredients') or []) + (recipe.get('missedIngredients') or []):
+            name = ing.get('name') or ing.get('originalName') or ing.get('original', '')
+            if name:
+                ingredients.append(name.lower())
     
     return ingredients
\ No newline at end of file
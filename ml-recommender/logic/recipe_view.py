@@ -0,0 +1,77 @@
+import threading
+
+from logic.ingredients import get_ingredients
+from utils.canonical import canonical_ingredient
+
+# requested diet -> the boolean field Spoonacular sets on a recipe
+DIET_FIELDS = {
+    'vegetarian': 'vegetarian',
+    'vegan': 'vegan',
+    'gluten free': 'glutenFree',
+    'ketogenic': 'ketogenic',
+    'dairy free': 'dairyFree',
+    'paleo': 'paleo',
+    'pescatarian': 'pescatarian',
+    'primal': 'primal',
+    'whole30': 'whole30',
+    'low fodmap': 'lowFodmap',
+}
+DIET_BITS = {diet: 1 << bit for bit, diet in enumerate(DIET_FIELDS)}
+
+# joins a recipe's ingredients so one regex search covers all of them
+INGREDIENT_SEPARATOR = '\x00'
+
+_ingredient_ids = {}
+_ingredient_names = []
+_intern_lock = threading.Lock()
+
+
+def intern_ingredient(name):
+    """Process-wide integer id for an ingredient string."""
+    ingredient_id = _ingredient_ids.get(name)
+    if ingredient_id is None:
+        with _intern_lock:
+            ingredient_id = _ingredient_ids.get(name)
+            if ingredient_id is None:
+                ingredient_id = len(_ingredient_names)
+                _ingredient_names.append(name)
+                _ingredient_ids[name] = ingredient_id
+    return ingredient_id
+
+
+def ingredient_name(ingredient_id):
+    return _ingredient_names[ingredient_id]
+
+
+def diets_mask(diets):
+    mask = 0
+    for diet in diets:
+        mask |= DIET_BITS.get(diet, 0)
+    return mask
+
+
+class RecipeView:
+    """Everything the filter and rank stages read from a recipe, extracted once when it enters the pipeline."""
+
+    __slots__ = ('recipe', 'ingredients', 'ingredient_ids', 'joined', 'diet_mask', 'diet_names')
+
+    def __init__(self, recipe):
+        self.recipe = recipe
+        self.ingredients = tuple(canonical_ingredient(i) for i in get_ingredients(recipe))
+        self.ingredient_ids = tuple(intern_ingredient(i) for i in self.ingredients)
+        self.joined = INGREDIENT_SEPARATOR.join(self.ingredients)
+
+        self.diet_names = frozenset(d.lower() for d in recipe.get('diets') or [])
+        mask = diets_mask(self.diet_names)
+        for diet, field in DIET_FIELDS.items():
+            if recipe.get(field, False):
+                mask |= DIET_BITS[diet]
+        self.diet_mask = mask
+
+
+def as_view(recipe):
+    return recipe if isinstance(recipe, RecipeView) else RecipeView(recipe)
+
+
+def build_views(recipes):
+    return [as_view(r) for r in recipes]
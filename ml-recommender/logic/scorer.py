@@ -1,33 +1,147 @@
-from logic.ingredients import get_ingredients
-
-def rank_recipes(recipes, pantry_items):
-    pantry_items = [item.lower().strip() for item in pantry_items]
-    
-    ranked = []
-    for recipe in recipes:
-        recipe_ingredients = get_ingredients(recipe)
-        
-        matched = 0
-        missing = 0
-        
-        for ingredient in recipe_ingredients:
-            if any(pantry_item in ingredient for pantry_item in pantry_items):
-                matched += 1
-            else:
-                missing += 1
-        
-        total = len(recipe_ingredients)
-        match_percentage = (matched / total * 100) if total > 0 else 0
-        
-        ranked.append({
-            'recipe': recipe,
-            'matched_ingredients': matched,
-            'missing_ingredients': missing,
-            'total_ingredients': total,
-            'match_percentage': round(match_percentage, 2),
-            'score': matched - (missing * 0.5)
-        })
-    
-    ranked.sort(key=lambda x: x['score'], reverse=True)
-    
-    return ranked
+from itertools import chain
+
+import numpy as np
+
+from logic.recipe_view import build_views, ingredient_name
+from utils.canonical import canonical_ingredients
+
+
+class IngredientMatrix:
+    """Candidate recipes (dicts or RecipeViews) as interned ingredient ids, built once and scored many times.
+
+    Each distinct ingredient string is checked against the pantry once, then the
+    per-recipe matched counts come out of a single weighted bincount.
+    """
+
+    def __init__(self, recipes):
+        views = build_views(recipes)
+        self.recipes = [v.recipe for v in views]
+        lengths = [len(v.ingredient_ids) for v in views]
+        ids = np.fromiter(chain.from_iterable(v.ingredient_ids for v in views), dtype=np.int64, count=sum(lengths))
+
+        self.totals = np.array(lengths, dtype=np.int64)
+        self.rows = np.repeat(np.arange(len(views), dtype=np.int64), self.totals)
+        unique_ids, self.ingredient_ids = np.unique(ids, return_inverse=True)
+        self.vocab = [ingredient_name(i) for i in unique_ids]
+
+    def pantry_hits(self, pantry_items):
+        """Which vocabulary ingredients some pantry item matches."""
+        return np.fromiter(
+            (any(pantry_item in ingredient for pantry_item in pantry_items) for ingredient in self.vocab),
+            dtype=bool,
+            count=len(self.vocab)
+        )
+
+    def matched_counts(self, pantry_items, hits=None):
+        if hits is None:
+            hits = self.pantry_hits(pantry_items)
+        counts = np.bincount(self.rows, weights=hits[self.ingredient_ids], minlength=len(self.recipes))
+        return counts.astype(np.int64)
+
+    def rank(self, pantry_items, top_n=None, allowed=None):
+        """Ranked entries for a pantry; `allowed` (a bool per recipe) leaves the other recipes out."""
+        matched = self.matched_counts(pantry_items)
+        scores = matched - (self.totals - matched) * 0.5
+        return [
+            _ranked_entry(self.recipes[i], int(matched[i]), int(self.totals[i]))
+            for i in top_allowed(scores, top_n, allowed)
+        ]
+
+
+class TfidfMatrix(IngredientMatrix):
+    """Ranks by cosine similarity of TF-IDF weighted ingredient vectors instead of raw counts.
+
+    IDF comes from the candidate set itself, so an ingredient nearly every
+    candidate uses (salt, water) weighs little and a distinctive one (the
+    protein) a lot. Recipe vectors are kept as their non-zeros; the pantry
+    vector is the vocabulary it matches, and every dot product comes out of one
+    weighted bincount.
+    """
+
+    def __init__(self, recipes):
+        super().__init__(recipes)
+        n_recipes, n_vocab = len(self.recipes), max(len(self.vocab), 1)
+        # canonical names can repeat within a recipe, so count (recipe, ingredient) pairs as term frequency
+        pairs, tf = np.unique(self.rows * n_vocab + self.ingredient_ids, return_counts=True)
+        self.pair_rows = pairs // n_vocab
+        self.pair_ids = pairs % n_vocab
+
+        df = np.bincount(self.pair_ids, minlength=len(self.vocab))
+        # smoothed, so an ingredient in every candidate still has weight 1
+        self.idf = np.log((1 + n_recipes) / (1 + df)) + 1
+        self.weights = tf * self.idf[self.pair_ids]
+        self.norms = np.sqrt(np.bincount(self.pair_rows, weights=self.weights ** 2, minlength=n_recipes))
+
+    def similarities(self, pantry_items, hits=None):
+        if hits is None:
+            hits = self.pantry_hits(pantry_items)
+        query = np.where(hits, self.idf, 0.0)
+        dots = np.bincount(self.pair_rows, weights=self.weights * query[self.pair_ids], minlength=len(self.recipes))
+        norms = self.norms * np.sqrt(query @ query)
+        return np.divide(dots, norms, out=np.zeros(len(self.recipes)), where=norms > 0)
+
+    def rank(self, pantry_items, top_n=None, allowed=None):
+        hits = self.pantry_hits(pantry_items)
+        matched = self.matched_counts(pantry_items, hits)
+        scores = self.similarities(pantry_items, hits)
+        return [
+            _ranked_entry(self.recipes[i], int(matched[i]), int(self.totals[i]), score=round(float(scores[i]), 4))
+            for i in top_allowed(scores, top_n, allowed)
+        ]
+
+
+# ranking engines selectable per request
+RANKERS = {
+    'count': IngredientMatrix,
+    'tfidf': TfidfMatrix,
+}
+
+
+def top_k(scores, k=None):
+    """Indices of the k highest scores, best first, ties kept in input order like a stable sort."""
+    n = len(scores)
+    if k is None or k >= n:
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+
+    kth_best = np.partition(scores, n - k)[n - k]
+    candidates = np.flatnonzero(scores >= kth_best)
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return order[:k]
+
+
+def top_allowed(scores, k=None, allowed=None):
+    """top_k over only the recipes `allowed` marks, as indices into `scores`."""
+    if allowed is None:
+        return top_k(scores, k)
+    indices = np.flatnonzero(allowed)
+    return indices[top_k(scores[indices], k)]
+
+
+def _ranked_entry(recipe, matched, total, score=None):
+    missing = total - matched
+    match_percentage = (matched / total * 100) if total > 0 else 0
+
+    return {
+        'recipe': recipe,
+        'matched_ingredients': matched,
+        'missing_ingredients': missing,
+        'total_ingredients': total,
+        'match_percentage': round(match_percentage, 2),
+        'score': matched - (missing * 0.5) if score is None else score
+    }
+
+
+def rank_recipes(recipes, pantry_items, top_n=None, ranker='count'):
+    pantry_items = canonical_ingredients(pantry_items)
+    return RANKERS[ranker](recipes).rank(pantry_items, top_n)
+
+
+def rank_recipes_batch(recipes, pantries, top_n=None, ranker='count'):
+    """Rank one candidate set against many pantries, building the ingredient matrix only once."""
+    matrix = RANKERS[ranker](recipes)
+    return [
+        matrix.rank(canonical_ingredients(pantry_items), top_n)
+        for pantry_items in pantries
+    ]
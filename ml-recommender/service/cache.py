@@ -0,0 +1,249 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+MONGO_URI = os.getenv("MONGO_URI")
+DB_NAME = os.getenv("DB_NAME", "pantry-pal")
+
+_mongo_client = None
+
+
+def get_shared_collection(name: str):
+    """Return a MongoDB collection for the shared cache tier, or None when Mongo isn't configured."""
+    global _mongo_client
+    if not MONGO_URI:
+        return None
+    if _mongo_client is None:
+        # fail fast so a missing database degrades to the in-process tier
+        _mongo_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=500)
+    return _mongo_client[DB_NAME][name]
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache whose entries expire after `ttl` seconds.
+
+    Expired entries stay until the LRU evicts them, so `get(key, allow_stale=True)`
+    can still serve them when fresh data can't be fetched.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, allow_stale=False):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic() and not allow_stale:
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store `value`; `ttl` overrides the cache's default lifetime for this entry."""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MongoCache:
+    """Shared cache tier backed by a MongoDB collection with a TTL index and a document cap."""
+
+    def __init__(self, collection, maxsize: int = 10000, ttl: float = 3600):
+        self.collection = collection
+        self.maxsize = maxsize
+        self.ttl = ttl
+        try:
+            collection.create_index("created_at", expireAfterSeconds=int(ttl))
+        except PyMongoError as e:
+            print(f"Could not create TTL index on {collection.name}: {e}")
+
+    def get(self, key, allow_stale=False):
+        try:
+            doc = self.collection.find_one({"_id": key})
+        except PyMongoError as e:
+            print(f"Shared cache read failed: {e}")
+            return None
+        if not doc:
+            return None
+        # the TTL monitor only runs once a minute, so check the age ourselves too
+        if not allow_stale and doc["created_at"] < datetime.utcnow() - timedelta(seconds=self.ttl):
+            return None
+        return doc["value"]
+
+    def set(self, key, value):
+        try:
+            self.collection.replace_one(
+                {"_id": key},
+                {"_id": key, "value": value, "created_at": datetime.utcnow()},
+                upsert=True
+            )
+            overflow = self.collection.estimated_document_count() - self.maxsize
+            if overflow > 0:
+                oldest = self.collection.find({}, {"_id": 1}).sort("created_at", 1).limit(overflow)
+                self.collection.delete_many({"_id": {"$in": [d["_id"] for d in oldest]}})
+        except PyMongoError as e:
+            print(f"Shared cache write failed: {e}")
+
+    def clear(self):
+        try:
+            self.collection.delete_many({})
+        except PyMongoError as e:
+            print(f"Shared cache clear failed: {e}")
+
+
+class TieredCache:
+    """In-process LRU in front of an optional shared Mongo tier, with hit/miss counters."""
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 3600, shared_maxsize: int = 10000):
+        self.name = name
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        collection = get_shared_collection(f"cache_{name}")
+        self.shared = MongoCache(collection, maxsize=shared_maxsize, ttl=ttl) if collection is not None else None
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            self.local_hits += 1
+            return value
+
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.shared_hits += 1
+                self.local.set(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    def get_stale(self, key):
+        """The last stored value even past its TTL, for when the upstream can't be called."""
+        value = self.local.get(key, allow_stale=True)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key, allow_stale=True)
+        if value is not None:
+            self.stale_hits += 1
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+        self.local_hits = self.shared_hits = self.misses = self.stale_hits = 0
+
+    def stats(self):
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            "size": len(self.local),
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "hit_rate": round((self.local_hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+class InstructionStore:
+    """Write-through store of analyzed instructions keyed by recipe id.
+
+    Instructions for a recipe practically never change, so stored entries are kept
+    for good. Recipes without instructions are remembered for `negative_ttl` seconds
+    so they don't cost an API call on every request either.
+    """
+
+    def __init__(self, maxsize: int = 4096, negative_ttl: float = 7 * 86400):
+        self.negative_ttl = negative_ttl
+        # only empty entries expire; the LRU bound is what evicts instructions
+        self.local = LRUCache(maxsize=maxsize, ttl=math.inf)
+        self.collection = get_shared_collection("recipe_instructions")
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def get(self, recipe_id: int):
+        """Return the stored instructions ([] for a known empty recipe), or None if unknown."""
+        instructions = self.local.get(recipe_id)
+        if instructions is None and self.collection is not None:
+            instructions = self._load(recipe_id)
+            if instructions is not None:
+                self._remember(recipe_id, instructions)
+
+        if instructions is None:
+            self.misses += 1
+        elif instructions:
+            self.hits += 1
+        else:
+            self.negative_hits += 1
+        return instructions
+
+    def _remember(self, recipe_id: int, instructions: list):
+        self.local.set(recipe_id, instructions, ttl=None if instructions else self.negative_ttl)
+
+    def set(self, recipe_id: int, instructions: list):
+        self._remember(recipe_id, instructions)
+        if self.collection is None:
+            return
+        try:
+            self.collection.replace_one(
+                {"_id": recipe_id},
+                {"_id": recipe_id, "instructions": instructions, "empty": not instructions,
+                 "fetched_at": datetime.utcnow()},
+                upsert=True
+            )
+        except PyMongoError as e:
+            print(f"Instruction store write failed for recipe {recipe_id}: {e}")
+
+    def _load(self, recipe_id: int):
+        try:
+            doc = self.collection.find_one({"_id": recipe_id})
+        except PyMongoError as e:
+            print(f"Instruction store read failed for recipe {recipe_id}: {e}")
+            return None
+        if not doc:
+            return None
+        if doc["empty"] and doc["fetched_at"] < datetime.utcnow() - timedelta(seconds=self.negative_ttl):
+            return None
+        return doc["instructions"]
+
+    def clear(self):
+        self.local.clear()
+        self.hits = self.negative_hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self.local),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,267 @@
+"""Local recipe corpus with an ingredient inverted index.
+
+Recipes from Spoonacular result pages (or any JSON recipe dump) are ingested
+into a single JSON file. Each ingredient word maps to the ids of the recipes
+that use it, so candidate generation for a pantry is a handful of set
+operations instead of a complexSearch round-trip. Large corpora can generate
+candidates from a MinHash LSH index over the same words instead (see
+service/lsh.py), which only touches recipes likely to be similar to the pantry,
+and re-score those exactly. LSH is off unless CORPUS_LSH_MIN_RECIPES is set:
+its default bands and rows have only been tried on synthetic benchmark data.
+
+    python -m service.corpus ingest results_page_1.json results_page_2.json
+    python -m service.corpus stats
+"""
+import argparse
+import json
+import os
+import threading
+from collections import Counter, defaultdict
+from itertools import islice
+from typing import List, Optional
+
+from logic.filters import compile_restrictions
+from logic.ingredients import get_ingredients
+from logic.recipe_view import RecipeView
+from logic.scorer import rank_recipes
+from service.lsh import MinHashLSH
+from utils.canonical import canonical_ingredient
+from utils.preprocessing import normalize_ingredients
+
+CORPUS_PATH = os.getenv(
+    "CORPUS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "corpus.json")
+)
+# bumped whenever ingredient_terms changes; a saved index of another version is rebuilt on load
+INDEX_VERSION = 2
+# more bands find more similar recipes, more rows per band return fewer dissimilar ones;
+# 32 x 3 comes from benchmarks/bench_lsh.py on synthetic recipes, not real pantries
+CORPUS_LSH_BANDS = int(os.getenv("CORPUS_LSH_BANDS", "32"))
+CORPUS_LSH_ROWS = int(os.getenv("CORPUS_LSH_ROWS", "3"))
+# from this many recipes search with LSH instead of the exact inverted index; 0 never does
+CORPUS_LSH_MIN_RECIPES = int(os.getenv("CORPUS_LSH_MIN_RECIPES", "0"))
+
+
+def ingredient_terms(name: str) -> List[str]:
+    return normalize_ingredients([name])[0].split()
+
+
+def recipe_terms(recipe):
+    return {term for ingredient in get_ingredients(recipe) for term in ingredient_terms(ingredient)}
+
+
+def pantry_terms(pantry: List[str]):
+    return {term for item in pantry for term in ingredient_terms(item)}
+
+
+def _with_extended_ingredients(recipe):
+    """complexSearch results only list used/missed ingredients; keep them in a form get_ingredients reads."""
+    if "extendedIngredients" in recipe or "ingredients" in recipe:
+        return recipe
+    names = [
+        i["name"]
+        for field in ("usedIngredients", "missedIngredients", "unusedIngredients")
+        for i in recipe.get(field) or []
+        if i.get("name")
+    ]
+    recipe = {k: v for k, v in recipe.items() if k not in ("usedIngredients", "missedIngredients", "unusedIngredients")}
+    recipe["extendedIngredients"] = [{"name": n} for n in dict.fromkeys(names)]
+    return recipe
+
+
+class RecipeCorpus:
+    def __init__(self, lsh_bands: int = CORPUS_LSH_BANDS, lsh_rows: int = CORPUS_LSH_ROWS):
+        self.recipes = {}
+        self.index = defaultdict(set)
+        self.lsh_bands = lsh_bands
+        self.lsh_rows = lsh_rows
+        self._lsh = None
+        self._lsh_lock = threading.Lock()
+        # RecipeViews for exact re-scoring, so repeated queries don't re-extract ingredients
+        self._views = {}
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def add(self, recipe):
+        if recipe.get("id") is None:
+            return
+        recipe = _with_extended_ingredients(recipe)
+        recipe_id = recipe["id"]
+        self.recipes[recipe_id] = recipe
+        self._views.pop(recipe_id, None)
+        terms = recipe_terms(recipe)
+        for term in terms:
+            self.index[term].add(recipe_id)
+        if self._lsh is not None:
+            self._lsh.add(recipe_id, terms)
+
+    @property
+    def uses_lsh(self):
+        """Whether `search` generates candidates from the LSH index by default."""
+        return 0 < CORPUS_LSH_MIN_RECIPES <= len(self)
+
+    @property
+    def lsh(self):
+        """The MinHash LSH index, built from the recipes on first use and kept up to date by `add`."""
+        if self._lsh is None:
+            with self._lsh_lock:
+                if self._lsh is None:
+                    lsh = MinHashLSH(self.lsh_bands, self.lsh_rows)
+                    for recipe_id, recipe in self.recipes.items():
+                        lsh.add(recipe_id, recipe_terms(recipe))
+                    self._lsh = lsh
+        return self._lsh
+
+    def postings(self, pantry_item: str):
+        """Ids of recipes with an ingredient containing every word of `pantry_item`."""
+        terms = ingredient_terms(pantry_item)
+        if not terms:
+            return set()
+        lists = sorted((self.index.get(t, set()) for t in terms), key=len)
+        result = set(lists[0])
+        for posting in lists[1:]:
+            result &= posting
+        return result
+
+    def _diet_allows(self, diet):
+        """A per-recipe-id check for `diet`, or None when there is no diet to apply."""
+        matcher = compile_restrictions({"diet": diet})
+        if not matcher.has_diet:
+            return None
+        return lambda recipe_id: matcher.allows(self.view(recipe_id))
+
+    def candidates(self, pantry: List[str], limit: int, diet=None):
+        """Union the postings of every pantry item, ranked by how many pantry items each recipe hits.
+
+        Like complexSearch, `diet` is applied before truncating to `limit`.
+        """
+        hits = Counter()
+        for item in dict.fromkeys(pantry):
+            hits.update(self.postings(item))
+        ranked = (recipe_id for recipe_id, _ in sorted(hits.items(), key=lambda kv: (-kv[1], kv[0])))
+        allows = self._diet_allows(diet)
+        if allows is not None:
+            ranked = filter(allows, ranked)
+        return [self.recipes[recipe_id] for recipe_id in islice(ranked, limit)]
+
+    def approximate_candidates(self, pantry: List[str], limit: int, diet=None):
+        """Recipes in an LSH bucket with the pantry, re-scored exactly; may return fewer than `limit`."""
+        recipe_ids = sorted(self.lsh.query(pantry_terms(pantry)))
+        allows = self._diet_allows(diet)
+        if allows is not None:
+            recipe_ids = [recipe_id for recipe_id in recipe_ids if allows(recipe_id)]
+        ranked = rank_recipes([self.view(recipe_id) for recipe_id in recipe_ids], pantry, top_n=limit)
+        return [entry["recipe"] for entry in ranked]
+
+    def view(self, recipe_id):
+        view = self._views.get(recipe_id)
+        if view is None:
+            view = self._views[recipe_id] = RecipeView(self.recipes[recipe_id])
+        return view
+
+    def search(self, pantry: List[str], number: int, diet=None, approximate: Optional[bool] = None):
+        """complexSearch-shaped results for a pantry (and diets), served from the local corpus.
+
+        `approximate` picks LSH candidate generation over the inverted index; by
+        default it is used once the corpus has CORPUS_LSH_MIN_RECIPES recipes.
+        """
+        pantry = normalize_ingredients(pantry)
+        if approximate is None:
+            approximate = self.uses_lsh
+        candidates = self.approximate_candidates if approximate else self.candidates
+        results = []
+        for recipe in candidates(pantry, number, diet):
+            used, missed = [], []
+            for ingredient in get_ingredients(recipe):
+                canonical = canonical_ingredient(ingredient)
+                matched = any(item in canonical for item in pantry)
+                (used if matched else missed).append({"name": ingredient})
+            results.append({**recipe, "usedIngredients": used, "missedIngredients": missed})
+        return results
+
+    def save(self, path: str = CORPUS_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = {
+            "version": INDEX_VERSION,
+            "recipes": list(self.recipes.values()),
+            "index": {term: sorted(ids) for term, ids in self.index.items()}
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = CORPUS_PATH):
+        corpus = cls()
+        if not os.path.exists(path):
+            return corpus
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            for recipe in data.get("recipes", []):
+                corpus.add(recipe)
+            return corpus
+        corpus.recipes = {r["id"]: r for r in data.get("recipes", [])}
+        for term, ids in data.get("index", {}).items():
+            corpus.index[term] = set(ids)
+        return corpus
+
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+
+def get_corpus():
+    """The process-wide corpus, loaded from CORPUS_PATH on first use.
+
+    When searches will use LSH, the index is built here with the load, so the
+    first request doesn't pay for signing every recipe.
+    """
+    global _corpus
+    if _corpus is None:
+        with _corpus_lock:
+            if _corpus is None:
+                corpus = RecipeCorpus.load(CORPUS_PATH)
+                if corpus.uses_lsh:
+                    corpus.lsh
+                _corpus = corpus
+    return _corpus
+
+
+def read_recipe_dump(path: str):
+    """Recipes from a complexSearch page ({"results": [...]}), a {"recipes": [...]} dump or a plain list."""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("results", data.get("recipes", []))
+    return [r for r in data if isinstance(r, dict)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local recipe corpus.")
+    parser.add_argument("--corpus", default=CORPUS_PATH, help="corpus file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="add recipes from JSON dumps to the corpus")
+    ingest.add_argument("files", nargs="+")
+    commands.add_parser("stats", help="print corpus size")
+    args = parser.parse_args(argv)
+
+    corpus = RecipeCorpus.load(args.corpus)
+    if args.command == "ingest":
+        before = len(corpus)
+        for path in args.files:
+            for recipe in read_recipe_dump(path):
+                corpus.add(recipe)
+        corpus.save(args.corpus)
+        print(f"Ingested {len(corpus) - before} new recipes into {args.corpus}")
+    print(f"{len(corpus)} recipes, {len(corpus.index)} indexed terms")
+    if CORPUS_LSH_MIN_RECIPES:
+        print(f"LSH: {corpus.lsh_bands} bands x {corpus.lsh_rows} rows, used from {CORPUS_LSH_MIN_RECIPES} recipes")
+    else:
+        print("LSH: off (set CORPUS_LSH_MIN_RECIPES to enable)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Record/replay storage for Spoonacular responses.
+
+In record mode every upstream response is saved as a gzip-compressed JSON
+"cassette" keyed by the normalized request (path and query parameters, without
+the API key). Replay mode serves those cassettes with no network access, with
+optional injected latency and error rate so load tests still see a realistic
+upstream.
+"""
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+CASSETTE_DIR = os.getenv(
+    "SPOONACULAR_CASSETTE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "cassettes")
+)
+# never part of a key, so cassettes recorded with one key replay with any other
+IGNORED_PARAMS = {"apiKey"}
+# comma-separated parameters Spoonacular treats as sets
+SET_PARAMS = {"includeIngredients", "excludeIngredients", "diet", "intolerances", "ids"}
+
+
+def _param_value(name, value):
+    if isinstance(value, bool):
+        value = "true" if value else "false"
+    value = str(value)
+    if name in SET_PARAMS:
+        value = ",".join(sorted({v.strip().lower() for v in value.split(",") if v.strip()}))
+    return value
+
+
+def normalize_request(method, url, params=None):
+    return {
+        "method": method.upper(),
+        "path": urlparse(url).path,
+        "params": {k: _param_value(k, v) for k, v in sorted((params or {}).items()) if k not in IGNORED_PARAMS},
+    }
+
+
+def cassette_key(request):
+    return hashlib.sha1(json.dumps(request, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def to_response(cassette, url):
+    """Rebuild a requests.Response, so callers handle replayed and live responses the same way."""
+    response = requests.Response()
+    response.status_code = cassette["status"]
+    response.reason = cassette.get("reason", "")
+    response.headers["Content-Type"] = cassette.get("content_type", "application/json")
+    response._content = cassette["body"].encode()
+    response.url = url
+    return response
+
+
+class CassetteStore:
+    """One gzip file per normalized request, written atomically so concurrent recorders don't corrupt it."""
+
+    def __init__(self, directory=CASSETTE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def get(self, request):
+        try:
+            with gzip.open(self._path(cassette_key(request)), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, request, response):
+        cassette = {
+            "request": request,
+            "status": response.status_code,
+            "reason": response.reason,
+            "content_type": response.headers.get("Content-Type", "application/json"),
+            "body": response.text,
+            "recorded_at": time.time(),
+        }
+        path = self._path(cassette_key(request))
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(cassette, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        if not os.path.isdir(self.directory):
+            return 0
+        return sum(len(files) for _, _, files in os.walk(self.directory))
+
+
+class Recorder:
+    """Sits in front of an HTTP `get` function in one of three modes.
+
+    - live: pass requests through
+    - record: pass requests through and save successful responses and 404s
+    - replay: serve saved responses only; a request with no cassette fails like a connection error
+    """
+
+    MODES = ("live", "record", "replay")
+    # auth, quota (402/429) and server errors are transient; replaying them would make them permanent
+    RECORD_STATUSES = (404,)
+
+    def __init__(self, get, mode="live", store=None, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown Spoonacular mode {mode!r}, expected one of {', '.join(self.MODES)}")
+        self._get = get
+        self.mode = mode
+        self.store = store if store is not None else CassetteStore()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self.injected_errors = 0
+
+    def get(self, url, params=None, **kwargs):
+        if self.mode == "live":
+            return self._get(url, params=params, **kwargs)
+
+        request = normalize_request("GET", url, params)
+        if self.mode == "record":
+            response = self._get(url, params=params, **kwargs)
+            if response.status_code // 100 == 2 or response.status_code in self.RECORD_STATUSES:
+                self.store.put(request, response)
+                self.recorded += 1
+            return response
+
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.injected_errors += 1
+            return to_response({"status": 503, "reason": "Injected error", "body": "{}"}, url)
+
+        cassette = self.store.get(request)
+        if cassette is None:
+            self.misses += 1
+            raise requests.ConnectionError(f"No cassette for {request['path']} {request['params']}")
+        self.replayed += 1
+        return to_response(cassette, url)
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+            "injected_errors": self.injected_errors,
+        }
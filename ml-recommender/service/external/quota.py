@@ -0,0 +1,145 @@
+"""Client-side rate limiting and daily point budget for Spoonacular.
+
+Spoonacular bills every call in points against a daily quota that resets at
+midnight UTC, and reports the running total in `X-API-Quota-Used` /
+`X-API-Quota-Left` response headers. QuotaLimiter paces calls with a token
+bucket, tracks the day's spend (trusting the headers whenever they are present)
+and keeps part of the budget for interactive searches: background calls such as
+instruction enrichment wait behind interactive ones and stop early once the
+budget runs low.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+
+class QuotaExhausted(Exception):
+    """Raised instead of making a call the budget or the rate limiter won't allow."""
+
+    def __init__(self, reason, retry_after=None):
+        super().__init__(f"Spoonacular call not allowed: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _today():
+    return datetime.now(timezone.utc).date()
+
+
+def seconds_until_reset():
+    now = datetime.now(timezone.utc)
+    return 86400 - (now.hour * 3600 + now.minute * 60 + now.second)
+
+
+def _header_float(headers, name):
+    value = headers.get(name)
+    if not isinstance(value, str):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class QuotaLimiter:
+    def __init__(self, daily_points: float = 150, rate: float = 5, burst: float = 10,
+                 background_reserve: float = 0.2, max_wait: float = 2.0):
+        self.daily_points = daily_points
+        self.rate = rate
+        self.burst = burst
+        # share of the daily budget only interactive calls may spend
+        self.background_reserve = background_reserve
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._interactive_waiting = 0
+        self.reset()
+
+    def reset(self):
+        with self._cond:
+            self._day = _today()
+            self.used = 0.0
+            self.server_budget = None
+            self._exhausted = False
+            self._tokens = self.burst
+            self._refilled_at = time.monotonic()
+            self.calls = {INTERACTIVE: 0, BACKGROUND: 0}
+            self.throttled = {INTERACTIVE: 0, BACKGROUND: 0}
+
+    @property
+    def left(self):
+        budget = self.daily_points if self.server_budget is None else self.server_budget
+        return 0.0 if self._exhausted else max(0.0, budget - self.used)
+
+    def _roll_day(self):
+        if _today() != self._day:
+            self._day = _today()
+            self.used = 0.0
+            self.server_budget = None
+            self._exhausted = False
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _budget_allows(self, priority, cost):
+        floor = self.daily_points * self.background_reserve if priority == BACKGROUND else 0.0
+        return self.left - cost >= floor
+
+    def acquire(self, priority=INTERACTIVE, cost=1.0, timeout=None):
+        """Take a token and reserve `cost` points, or raise QuotaExhausted."""
+        deadline = time.monotonic() + (self.max_wait if timeout is None else timeout)
+        with self._cond:
+            if priority == INTERACTIVE:
+                self._interactive_waiting += 1
+            try:
+                while True:
+                    # checked on every pass, other callers may spend the budget while this one waits
+                    self._roll_day()
+                    if not self._budget_allows(priority, cost):
+                        self.throttled[priority] += 1
+                        raise QuotaExhausted("daily budget", retry_after=seconds_until_reset())
+
+                    self._refill()
+                    # background calls never take a token an interactive caller is waiting for
+                    if self._tokens >= 1 and (priority == INTERACTIVE or not self._interactive_waiting):
+                        self._tokens -= 1
+                        self.used += cost
+                        self.calls[priority] += 1
+                        return
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.throttled[priority] += 1
+                        raise QuotaExhausted("rate limit", retry_after=1 / self.rate if self.rate else 1)
+                    self._cond.wait(min(remaining, max(0.001, (1 - self._tokens) / self.rate)))
+            finally:
+                if priority == INTERACTIVE:
+                    self._interactive_waiting -= 1
+                    self._cond.notify_all()
+
+    def update(self, response):
+        """Correct the local estimate from the quota headers of a response."""
+        used = _header_float(response.headers, "X-API-Quota-Used")
+        left = _header_float(response.headers, "X-API-Quota-Left")
+        with self._cond:
+            if used is not None:
+                self.used = used
+                if left is not None:
+                    # the plan's real daily limit, which may differ from the configured one
+                    self.server_budget = used + left
+            # 402 Payment Required: the day's points are gone whatever we counted
+            if response.status_code == 402:
+                self._exhausted = True
+
+    def stats(self):
+        return {
+            "daily_points": self.daily_points,
+            "used": round(self.used, 2),
+            "left": round(self.left, 2),
+            "calls": dict(self.calls),
+            "throttled": dict(self.throttled),
+            "resets_in": seconds_until_reset(),
+        }
@@ -1,15 +1,131 @@
 from fastapi import FastAPI, HTTPException
+from prometheus_client import Counter, Gauge, Histogram
 from pydantic import BaseModel
 from typing import List, Optional
 import requests
+import json
 import os
+import time
+
+from service import http_client, metrics
+from service.cache import InstructionStore, TieredCache
+from service.external.cassette import CassetteStore, Recorder
+from service.external.quota import BACKGROUND, INTERACTIVE, QuotaExhausted, QuotaLimiter
+from utils.canonical import canonical_ingredient
 
 API_KEY = os.getenv("SPOONACULAR_API_KEY", "bb717f69d3f34841aa7761d88c81ce7b")
 if not API_KEY:
     raise ValueError("SPOONACULAR_API_KEY is not set in environment variables")
 
-BASE_URL = "https://api.spoonacular.com"
+# point at a local fake upstream for benchmarks (see benchmarks/fake_upstream.py)
+BASE_URL = os.getenv("SPOONACULAR_BASE_URL", "https://api.spoonacular.com")
 COMPLEX_SEARCH_URL = f"{BASE_URL}/recipes/complexSearch"
+INFORMATION_BULK_URL = f"{BASE_URL}/recipes/informationBulk"
+
+# live | record | replay, see service/external/cassette.py
+SPOONACULAR_MODE = os.getenv("SPOONACULAR_MODE", "live")
+REPLAY_LATENCY_MS = float(os.getenv("SPOONACULAR_REPLAY_LATENCY_MS", "0"))
+REPLAY_JITTER_MS = float(os.getenv("SPOONACULAR_REPLAY_JITTER_MS", "0"))
+REPLAY_ERROR_RATE = float(os.getenv("SPOONACULAR_REPLAY_ERROR_RATE", "0"))
+
+# points per day on the Spoonacular plan; the quota headers of each response correct our own count
+DAILY_POINTS = float(os.getenv("SPOONACULAR_DAILY_POINTS", "150"))
+RATE_PER_SECOND = float(os.getenv("SPOONACULAR_RATE_PER_SECOND", "5"))
+RATE_BURST = float(os.getenv("SPOONACULAR_RATE_BURST", "10"))
+BACKGROUND_RESERVE = float(os.getenv("SPOONACULAR_BACKGROUND_RESERVE", "0.2"))
+QUOTA_MAX_WAIT = float(os.getenv("SPOONACULAR_QUOTA_MAX_WAIT", "2"))
+
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "21600"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_SHARED_SIZE = int(os.getenv("SEARCH_CACHE_SHARED_SIZE", "10000"))
+
+search_cache = TieredCache(
+    "complex_search",
+    maxsize=SEARCH_CACHE_SIZE,
+    ttl=SEARCH_CACHE_TTL,
+    shared_maxsize=SEARCH_CACHE_SHARED_SIZE
+)
+
+instruction_store = InstructionStore(
+    maxsize=int(os.getenv("INSTRUCTION_CACHE_SIZE", "4096")),
+    negative_ttl=float(os.getenv("INSTRUCTION_NEGATIVE_TTL", str(7 * 86400)))
+)
+
+
+
+def _live_get(url, **kwargs):
+    return http_client.get(url, **kwargs)
+
+
+# every upstream call goes through the recorder, which passes through in live mode
+recorder = Recorder(
+    _live_get,
+    mode=SPOONACULAR_MODE,
+    store=CassetteStore(),
+    latency=REPLAY_LATENCY_MS / 1000,
+    jitter=REPLAY_JITTER_MS / 1000,
+    error_rate=REPLAY_ERROR_RATE
+)
+
+quota = QuotaLimiter(
+    daily_points=DAILY_POINTS,
+    rate=RATE_PER_SECOND,
+    burst=RATE_BURST,
+    background_reserve=BACKGROUND_RESERVE,
+    max_wait=QUOTA_MAX_WAIT
+)
+
+upstream_requests = Counter(
+    "upstream_requests_total", "Spoonacular calls by endpoint and outcome.", ["endpoint", "outcome"]
+)
+upstream_seconds = Histogram(
+    "upstream_request_duration_seconds", "Spoonacular call latency.", ["endpoint"],
+    buckets=metrics.DEFAULT_BUCKETS
+)
+
+upstream_throttled = Counter(
+    "upstream_throttled_total", "Spoonacular calls refused by the quota limiter.", ["priority", "reason"]
+)
+Gauge("spoonacular_quota_left_points", "Points left in today's Spoonacular budget.").set_function(
+    lambda: quota.left)
+
+
+def bulk_cost(count):
+    """Points for an informationBulk call: 1 for the first recipe and 0.5 for each additional one."""
+    return 1 + 0.5 * max(0, count - 1)
+
+
+def search_cost(number):
+    """Estimated points for a complexSearch: 1 + 0.01 per result + 0.025 each for recipe information and ingredients."""
+    return 1 + number * 0.06
+
+
+def _upstream_get(endpoint, url, priority=INTERACTIVE, cost=1.0, **kwargs):
+    """One Spoonacular call, counted by status class (2xx, 4xx, ...) or "error" when no response came back.
+
+    Raises QuotaExhausted when the rate limiter or the daily budget won't allow
+    the call. Replayed calls cost nothing and skip the limiter.
+    """
+    metered = recorder.mode != "replay"
+    if metered:
+        try:
+            quota.acquire(priority, cost)
+        except QuotaExhausted as e:
+            upstream_throttled.labels(priority, e.reason).inc()
+            raise
+
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        response = recorder.get(url, **kwargs)
+        outcome = f"{response.status_code // 100}xx"
+        if metered:
+            quota.update(response)
+        return response
+    finally:
+        upstream_seconds.labels(endpoint).observe(time.perf_counter() - start)
+        upstream_requests.labels(endpoint, outcome).inc()
+
 
 app = FastAPI()
 
@@ -21,7 +137,34 @@ class RecommendationRequest(BaseModel):
     include_instructions: Optional[bool] = False
 
 
-def get_recipes_by_ingredients(ingredients: List[str], top_n: int, dietary: Optional[List[str]] = None):
+def search_cache_key(ingredients: List[str], top_n: int, dietary: Optional[List[str]] = None):
+    """Build a cache key that is the same for any ordering/spelling of the same pantry and diets."""
+    pantry = sorted({canonical_ingredient(i) for i in ingredients if i and i.strip()})
+    diets = sorted({d.lower().strip() for d in dietary or [] if d and d.strip()})
+    return "complexSearch:" + json.dumps([pantry, diets, top_n], separators=(",", ":"))
+
+
+def upstream_error(e, not_found_detail=None):
+    """The HTTPException for a failed Spoonacular call: 503 with Retry-After when throttled, 404 or 502 otherwise."""
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    if isinstance(e, QuotaExhausted) or status in (402, 429):
+        retry_after = getattr(e, "retry_after", None) or 60
+        return HTTPException(status_code=503, detail="Spoonacular quota exhausted, try again later",
+                             headers={"Retry-After": str(int(retry_after))})
+    if status == 404 and not_found_detail:
+        return HTTPException(status_code=404, detail=not_found_detail)
+    return HTTPException(status_code=502, detail=f"Spoonacular request failed: {e}")
+
+
+def get_recipes_by_ingredients(ingredients: List[str], top_n: int, dietary: Optional[List[str]] = None,
+                               use_cache: bool = True, priority: str = INTERACTIVE):
+    """Run complexSearch for a pantry. `use_cache=False` skips the cache read but still refreshes it."""
+    key = search_cache_key(ingredients, top_n, dietary)
+    if use_cache:
+        cached = search_cache.get(key)
+        if cached is not None:
+            return cached
+
     params = {
         "apiKey": API_KEY,
         "includeIngredients": ",".join(ingredients),
@@ -35,15 +178,39 @@ def get_recipes_by_ingredients(ingredients: List[str], top_n: int, dietary: Opti
         params["diet"] = ",".join(dietary)
 
     try:
-        resp = requests.get(COMPLEX_SEARCH_URL, params=params)
+        resp = _upstream_get("complexSearch", COMPLEX_SEARCH_URL, priority=priority, cost=search_cost(top_n),
+                             params=params)
         resp.raise_for_status()
-        return resp.json().get("results", [])
-    except requests.RequestException as e:
+        results = resp.json().get("results", [])
+        search_cache.set(key, results)
+        return results
+    except (QuotaExhausted, requests.RequestException) as e:
+        # an expired answer beats an error page
+        stale = search_cache.get_stale(key)
+        if stale is not None:
+            print(f"Serving stale search results after: {e}")
+            return stale
+
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        if isinstance(e, QuotaExhausted) or status in (402, 429):
+            raise upstream_error(e)
         print(e,e.response)
         raise HTTPException(status_code=500, detail=f"Error fetching recipes: {e}")
 
 
-def get_recipe_instructions(recipe_id: int, step_breakdown: bool = True):
+def get_recipe_instructions(recipe_id: int, step_breakdown: bool = True, timeout: Optional[float] = None,
+                            priority: str = BACKGROUND, raise_errors: bool = False):
+    """Return raw analyzedInstructions, served from the instruction store when possible.
+
+    Enrichment fetches run at background priority; a user opening one recipe should pass INTERACTIVE.
+    Failures return None, or with `raise_errors` an HTTPException that tells a
+    missing recipe (404) from an upstream failure (502, or 503 when throttled).
+    """
+    if step_breakdown:
+        stored = instruction_store.get(recipe_id)
+        if stored is not None:
+            return stored
+
     url = f"{BASE_URL}/recipes/{recipe_id}/analyzedInstructions"
 
     params = {
@@ -52,13 +219,70 @@ def get_recipe_instructions(recipe_id: int, step_breakdown: bool = True):
     }
 
     try:
-        response = requests.get(url, params=params)
+        response = _upstream_get("analyzedInstructions", url, priority=priority, params=params, timeout=timeout)
         response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        instructions = response.json()
+    except (QuotaExhausted, requests.RequestException) as e:
         print(f"Error fetching instructions for recipe {recipe_id}: {e}")
+        if raise_errors:
+            raise upstream_error(e, "Instructions not found")
         return None
 
+    if step_breakdown:
+        instruction_store.set(recipe_id, instructions)
+    return instructions
+
+
+def stored_instructions(recipe_ids):
+    """Split ids into ({id: instructions} already in the instruction store, [ids still to fetch])."""
+    found, missing = {}, []
+    for recipe_id in recipe_ids:
+        stored = instruction_store.get(recipe_id)
+        if stored is None:
+            missing.append(recipe_id)
+        else:
+            found[recipe_id] = stored
+    return found, missing
+
+
+def get_recipe_instructions_bulk(recipe_ids: List[int], timeout: Optional[float] = None,
+                                 priority: str = BACKGROUND):
+    """Raw analyzedInstructions for many recipes in one informationBulk call, stored like single fetches.
+
+    Returns {id: instructions}; ids the call failed for are left out. Callers
+    split large id lists into chunks and skip ids already in the store.
+    """
+    if not recipe_ids:
+        return {}
+
+    params = {
+        "apiKey": API_KEY,
+        "ids": ",".join(str(i) for i in recipe_ids),
+        "includeNutrition": "false"
+    }
+
+    try:
+        response = _upstream_get("informationBulk", INFORMATION_BULK_URL, priority=priority,
+                                 cost=bulk_cost(len(recipe_ids)), params=params, timeout=timeout)
+        response.raise_for_status()
+        information = response.json()
+    except (QuotaExhausted, requests.RequestException) as e:
+        print(f"Error fetching instructions for recipes {recipe_ids}: {e}")
+        return {}
+
+    if not isinstance(information, list):
+        print(f"Unexpected informationBulk response for recipes {recipe_ids}")
+        return {}
+
+    instructions = {}
+    for recipe in information:
+        if not isinstance(recipe, dict) or recipe.get("id") is None:
+            continue
+        # informationBulk returns the same step breakdown as analyzedInstructions
+        instructions[recipe["id"]] = recipe.get("analyzedInstructions") or []
+        instruction_store.set(recipe["id"], instructions[recipe["id"]])
+    return instructions
+
 
 def format_instructions(analyzed_instructions):
     """Format analyzed instructions into a cleaner structure."""
@@ -0,0 +1,94 @@
+"""MinHash signatures in banded LSH buckets, for approximate set-similarity lookups.
+
+A set of tokens is summarized by `bands * rows` MinHash values; two sets agree
+on any one value with probability equal to their Jaccard similarity. Values are
+grouped into bands of `rows`, and sets sharing every value of at least one band
+land in the same bucket, so a query only touches the sets likely to be similar.
+A pair with similarity s becomes a candidate with probability
+1 - (1 - s**rows)**bands: more bands raise recall, more rows cut false
+positives. The threshold where that curve turns is about (1 / bands) ** (1 / rows).
+"""
+import zlib
+from collections import defaultdict
+from functools import lru_cache
+
+import numpy as np
+
+# Mersenne prime for the universal hashes (a * x + b) mod p
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+@lru_cache(maxsize=65536)
+def token_hash(token: str) -> int:
+    # stable across processes, unlike hash()
+    return zlib.crc32(token.encode())
+
+
+class MinHashLSH:
+    def __init__(self, bands: int = 32, rows: int = 3, seed: int = 1):
+        self.bands = bands
+        self.rows = rows
+        rng = np.random.default_rng(seed)
+        # a * x wraps around in uint64, which is what mixes the bits: with small
+        # a and x the hash would grow with x and every permutation pick the same minimum
+        self.a = rng.integers(1, _PRIME, size=bands * rows, dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, size=bands * rows, dtype=np.uint64)
+        self.buckets = [defaultdict(set) for _ in range(bands)]
+        self.signatures = {}
+
+    def __len__(self):
+        return len(self.signatures)
+
+    @property
+    def threshold(self):
+        """Jaccard similarity at which a pair becomes a candidate about half the time."""
+        return (1 / self.bands) ** (1 / self.rows)
+
+    def signature(self, tokens):
+        hashes = np.fromiter((token_hash(t) for t in set(tokens)), dtype=np.uint64)
+        if not len(hashes):
+            return None
+        return (((np.outer(hashes, self.a) + self.b) % _PRIME) & _MAX_HASH).min(axis=0)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [signature[i * rows:(i + 1) * rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key, tokens):
+        """Index `key` under the signature of `tokens`; a key with no tokens is never a candidate."""
+        if key in self.signatures:
+            self.remove(key)
+        signature = self.signature(tokens)
+        if signature is None:
+            return
+        self.signatures[key] = signature
+        for buckets, band_key in zip(self.buckets, self._band_keys(signature)):
+            buckets[band_key].add(key)
+
+    def remove(self, key):
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for buckets, band_key in zip(self.buckets, self._band_keys(signature)):
+            buckets[band_key].discard(key)
+            if not buckets[band_key]:
+                del buckets[band_key]
+
+    def _candidates(self, signature):
+        candidates = set()
+        for buckets, band_key in zip(self.buckets, self._band_keys(signature)):
+            candidates |= buckets.get(band_key, set())
+        return candidates
+
+    def query(self, tokens):
+        """Keys sharing at least one band with the signature of `tokens`."""
+        signature = self.signature(tokens)
+        return set() if signature is None else self._candidates(signature)
+
+    def similarity(self, key, tokens):
+        """MinHash estimate of the Jaccard similarity between an indexed key and `tokens`."""
+        signature = self.signature(tokens)
+        if signature is None or key not in self.signatures:
+            return 0.0
+        return float(np.mean(self.signatures[key] == signature))
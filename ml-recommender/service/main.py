@@ -1,16 +1,30 @@
-import requests
 import os
+import json
+import hashlib
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed, wait
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from service.external.spoonacular_api import get_recipes_by_ingredients
+from service.external.spoonacular_api import get_recipes_by_ingredients, search_cache
+from service.external.spoonacular_api import get_recipe_instructions as fetch_recipe_instructions
+from service.external.spoonacular_api import instruction_store, quota, recorder, stored_instructions
+from service.external.spoonacular_api import get_recipe_instructions_bulk as fetch_recipe_instructions_bulk
+from service.external.quota import BACKGROUND, INTERACTIVE
+from service import http_client, metrics
+from service.corpus import get_corpus
+from service.singleflight import SingleFlight
 from utils.preprocessing import normalize_ingredients
 from logic.filters import validate_restrictions
-from logic.filters import filter_recipes
-from logic.scorer import rank_recipes
+from logic.filters import compile_restrictions, filter_recipes
+from logic.scorer import RANKERS, rank_recipes
+from logic.recipe_view import build_views
 #from logic.ingredients import get_ingredients
 
 app = FastAPI()
@@ -29,83 +43,423 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+request_seconds = Histogram(
+    "http_request_duration_seconds", "Time to produce a response, by route.", ["method", "route"],
+    buckets=metrics.DEFAULT_BUCKETS
+)
+requests_total = Counter(
+    "http_requests_total", "Responses by route and status code.", ["method", "route", "status"]
+)
+
+
+@app.middleware("http")
+async def time_request(request: Request, call_next):
+    """Collect the request's stage timings, send them as Server-Timing and record the total."""
+    timer = metrics.start_request()
+    start = time.perf_counter()
+    response = await call_next(request)
+    total = time.perf_counter() - start
+
+    route = request.scope.get("route")
+    # route templates, not raw paths, so recipe ids don't each become a series
+    path = route.path if route is not None else "unmatched"
+    request_seconds.labels(request.method, path).observe(total)
+    requests_total.labels(request.method, path, str(response.status_code)).inc()
+    response.headers["Server-Timing"] = timer.server_timing(total)
+    return response
+
+
 class RecommendationRequest(BaseModel):
     ingredients: List[str]
     top_n: int = 5
     dietary: Optional[List[str]] = None
     intolerances: Optional[List[str]] = None
     excluded_ingredients: Optional[List[str]] = None
+    use_cache: bool = True
+    # "local" serves candidates from the ingested recipe corpus instead of complexSearch
+    source: Literal["api", "local"] = "api"
+    # clients that load instructions per recipe (GET /recipe/{id}/instructions) can skip them here
+    include_instructions: bool = True
+    # "tfidf" ranks by TF-IDF cosine similarity, so staples count less than distinctive ingredients
+    ranker: Literal["count", "tfidf"] = "count"
+
+
+class BatchRecommendationItem(RecommendationRequest):
+    request_id: str
+
+
+class BatchRecommendationRequest(BaseModel):
+    requests: List[BatchRecommendationItem]
 
-API_KEY = os.getenv("SPOONACULAR_API_KEY","bb717f69d3f34841aa7761d88c81ce7b")
-BASE_URL = "https://api.spoonacular.com"
+# Instruction enrichment runs on a shared pool so one request costs roughly
+# one search plus the slowest bulk instruction call instead of the sum of all of them.
+ENRICH_MAX_WORKERS = int(os.getenv("ENRICH_MAX_WORKERS", "8"))
+ENRICH_TIMEOUT = float(os.getenv("ENRICH_TIMEOUT", "5"))
+# recipe ids per informationBulk call
+INSTRUCTIONS_CHUNK_SIZE = int(os.getenv("INSTRUCTIONS_CHUNK_SIZE", "25"))
 
-def get_recipe_instructions(recipe_id: int):
+enrich_pool = ThreadPoolExecutor(max_workers=ENRICH_MAX_WORKERS, thread_name_prefix="enrich")
 
-    url = f"{BASE_URL}/recipes/{recipe_id}/analyzedInstructions"
-    params = {"apiKey": API_KEY, "stepBreakdown": True}
+# identical requests that arrive while one is being computed share its result
+recommendation_flight = SingleFlight()
+
+# batches run their searches and instruction fetches on their own pool, so a
+# large batch can't hold up instruction enrichment for interactive requests
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "500"))
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+
+batch_pool = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix="batch")
+batch_queries = Counter(
+    "batch_queries_total", "Batch requests received, distinct queries among them and searches made.", ["kind"]
+)
+
+# analyzed instructions for a recipe id practically never change
+INSTRUCTIONS_MAX_AGE = int(os.getenv("INSTRUCTIONS_MAX_AGE", str(7 * 86400)))
+
+def format_recipe_instructions(data):
+    formatted = []
+    for section in data:
+        formatted_section = {
+            "name": section.get("name", "Main Recipe"),
+            "steps": []
+        }
+        for step in section.get("steps", []):
+            formatted_section["steps"].append({
+                "number": step.get("number"),
+                "instruction": step.get("step"),
+                "ingredients": [i["name"] for i in step.get("ingredients", [])],
+                "equipment": [e["name"] for e in step.get("equipment", [])],
+                "time": step.get("length")
+            })
+        formatted.append(formatted_section)
+    return formatted
+
+
+def formatted_instructions(recipe_id, data):
+    if not data:
+        return []
 
     try:
-        resp = requests.get(url, params=params)
-        resp.raise_for_status()
-        data = resp.json()
-        
-        formatted = []
-        for section in data:
-            formatted_section = {
-                "name": section.get("name", "Main Recipe"),
-                "steps": []
-            }
-            for step in section.get("steps", []):
-                formatted_section["steps"].append({
-                    "number": step.get("number"),
-                    "instruction": step.get("step"),
-                    "ingredients": [i["name"] for i in step.get("ingredients", [])],
-                    "equipment": [e["name"] for e in step.get("equipment", [])],
-                    "time": step.get("length")
-                })
-            formatted.append(formatted_section)
-        return formatted
+        return format_recipe_instructions(data)
     except Exception as e:
-        print(f"Error fetching instructions for recipe {recipe_id}: {e}")
+        print(f"Error formatting instructions for recipe {recipe_id}: {e}")
         return []
-    
+
+
+def chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def submit_instruction_fetches(recipes, pool=enrich_pool):
+    """Instructions already stored, plus {future: ids} for bulk fetches of the rest, one per chunk."""
+    found, missing = stored_instructions([r.get("id") for r in recipes])
+    futures = {
+        pool.submit(fetch_recipe_instructions_bulk, chunk, ENRICH_TIMEOUT): chunk
+        for chunk in chunks(missing, INSTRUCTIONS_CHUNK_SIZE)
+    }
+    return found, futures
+
+
+def enrich_recipes(recipes):
+    """Fetch instructions for all recipes, returned in the same order as `recipes`.
+
+    Uncached ids are fetched in informationBulk chunks that run concurrently, so
+    a request costs roughly one upstream call per chunk instead of one per recipe.
+    """
+    found, futures = submit_instruction_fetches(recipes)
+    if futures:
+        # every call is bounded by ENRICH_TIMEOUT, queued chunks wait for a free worker
+        waves = math.ceil(len(futures) / ENRICH_MAX_WORKERS)
+        wait(futures, timeout=ENRICH_TIMEOUT * waves)
+        for future, chunk in futures.items():
+            if future.done():
+                found.update(future.result())
+            else:
+                future.cancel()
+                print(f"Timed out fetching instructions for recipes {chunk}")
+
+    return [formatted_instructions(r.get("id"), found.get(r.get("id"))) for r in recipes]
+
+
+def canonical_values(values):
+    return sorted({v.lower().strip() for v in values or [] if v and v.strip()})
+
+
+def recommendation_key(request: RecommendationRequest):
+    """Requests with the same normalized pantry and restrictions get the same key."""
+    return json.dumps([
+        canonical_values(normalize_ingredients(request.ingredients)),
+        request.top_n,
+        canonical_values(request.dietary),
+        canonical_values(request.intolerances),
+        canonical_values(request.excluded_ingredients),
+        request.source,
+        request.use_cache,
+        request.include_instructions,
+        request.ranker,
+    ], separators=(",", ":"))
+
 
 @app.post("/recommendations")
 def recommend(request: RecommendationRequest):
-    # Preprocess ingredients
-    pantry = normalize_ingredients(request.ingredients)
-    print(1)
-    print(2)
-    # Fetch recipes from Spoonacular
-    recipes = get_recipes_by_ingredients(pantry, request.top_n * 5, request.dietary)
-    print(3)
-    restrictions = validate_restrictions({
+    return recommendation_flight.do(recommendation_key(request), build_recommendations, request)
+
+
+def fetch_candidates(request: RecommendationRequest, pantry, number, priority=INTERACTIVE):
+    if request.source == "local":
+        # complexSearch applies the diet server-side; do the same before the corpus truncates to `number`
+        return get_corpus().search(pantry, number, request_restrictions(request).get("diet"))
+    return get_recipes_by_ingredients(pantry, number, request.dietary, use_cache=request.use_cache,
+                                      priority=priority)
+
+
+def request_restrictions(request: RecommendationRequest):
+    return validate_restrictions({
         "diet": request.dietary,
         "intolerances": request.intolerances,
         "excluded_ingredients": request.excluded_ingredients
     })
-    print(4)
-    filtered_recipes = filter_recipes(recipes, restrictions)
-    print(5)
-    ranked_recipes = rank_recipes(filtered_recipes, pantry)
-    print(6)
-    # Simplify results for the frontend
-    simplified = []
-    for r in recipes:
-        used = [i["name"] for i in r.get("usedIngredients") or []]
-        missed = [i["name"] for i in r.get("missedIngredients") or []]
-
-        instructions = get_recipe_instructions(r.get("id"))
-
-        simplified.append({
-            "id": r.get("id"),
-            "name": r.get("title"),
-            "matched_ingredients": used,
-            "missing_ingredients": missed,
-            "image": r.get("image"),
-            "dietary_tags": r.get("diets", []),
-            "instructions": instructions
-        })
-    print(7)
-
-    return simplified
\ No newline at end of file
+
+
+def select_recipes(request: RecommendationRequest):
+    """fetch -> filter -> rank -> truncate: the top_n ranked entries, each with the scorer's match fields."""
+    with metrics.stage("normalize"):
+        pantry = normalize_ingredients(request.ingredients)
+
+    # Fetch a wider candidate pool from Spoonacular or the local corpus so filtering still leaves top_n
+    with metrics.stage("fetch"):
+        recipes = fetch_candidates(request, pantry, request.top_n * 5)
+
+    with metrics.stage("validate"):
+        restrictions = request_restrictions(request)
+
+    with metrics.stage("filter"):
+        # extract ingredients and diet flags once for both the filter and rank stages
+        views = build_views(recipes)
+        filtered_recipes = filter_recipes(views, restrictions)
+
+    with metrics.stage("rank"):
+        # top_k selection truncates to top_n without sorting the whole pool
+        return rank_recipes(filtered_recipes, pantry, top_n=request.top_n, ranker=request.ranker)
+
+
+def summarize_recipe(r):
+    """Simplify a recipe for the frontend."""
+    used = [i["name"] for i in r.get("usedIngredients") or []]
+    missed = [i["name"] for i in r.get("missedIngredients") or []]
+
+    return {
+        "id": r.get("id"),
+        "name": r.get("title"),
+        "matched_ingredients": used,
+        "missing_ingredients": missed,
+        "image": r.get("image"),
+        "dietary_tags": r.get("diets", [])
+    }
+
+
+def summarize_ranked(entry):
+    """A ranked entry from the scorer as a frontend summary plus its match fields."""
+    return {
+        **summarize_recipe(entry["recipe"]),
+        "match_percentage": entry["match_percentage"],
+        "score": entry["score"],
+        "total_ingredients": entry["total_ingredients"],
+    }
+
+
+def build_recommendations(request: RecommendationRequest):
+    ranked = select_recipes(request)
+    summaries = [summarize_ranked(entry) for entry in ranked]
+    if not request.include_instructions:
+        return summaries
+
+    # only the recipes that survived ranking are enriched
+    with metrics.stage("enrich"):
+        instructions = enrich_recipes([entry["recipe"] for entry in ranked])
+    return [{**summary, "instructions": i} for summary, i in zip(summaries, instructions)]
+
+
+def iter_instructions(recipes, pool=enrich_pool, workers=ENRICH_MAX_WORKERS):
+    """Yield (recipe id, instructions): stored ones first, then each bulk chunk as it finishes."""
+    found, futures = submit_instruction_fetches(recipes, pool)
+    for recipe_id, data in found.items():
+        yield recipe_id, formatted_instructions(recipe_id, data)
+    if not futures:
+        return
+
+    waves = math.ceil(len(futures) / workers)
+    try:
+        for future in as_completed(futures, timeout=ENRICH_TIMEOUT * waves):
+            fetched = future.result()
+            for recipe_id in futures[future]:
+                yield recipe_id, formatted_instructions(recipe_id, fetched.get(recipe_id))
+    except TimeoutError:
+        for future, chunk in futures.items():
+            if not future.done():
+                future.cancel()
+                print(f"Timed out fetching instructions for recipes {chunk}")
+                for recipe_id in chunk:
+                    yield recipe_id, []
+
+
+def stream_recommendations(request: RecommendationRequest, ranked):
+    """NDJSON: the ranked summaries first, then one line per recipe as its instructions arrive."""
+    yield json.dumps({"type": "recipes", "recipes": [summarize_ranked(entry) for entry in ranked]}) + "\n"
+    if not request.include_instructions:
+        return
+    for recipe_id, instructions in iter_instructions([entry["recipe"] for entry in ranked]):
+        yield json.dumps({"type": "instructions", "id": recipe_id, "instructions": instructions}) + "\n"
+
+
+@app.post("/recommendations/stream")
+def recommend_stream(request: RecommendationRequest):
+    # search and rank before the 200 goes out, so upstream failures still come back as 5xx
+    ranked = select_recipes(request)
+    return StreamingResponse(stream_recommendations(request, ranked), media_type="application/x-ndjson")
+
+
+def search_key(request: RecommendationRequest, pantry):
+    """Queries that can share one candidate search: same source, pantry, diets and cache policy."""
+    return json.dumps([request.source, canonical_values(pantry), canonical_values(request.dietary),
+                       request.use_cache], separators=(",", ":"))
+
+
+def stream_batch(batch: BatchRecommendationRequest):
+    """NDJSON for many requests sharing upstream work.
+
+    Identical queries are answered once. Each distinct search runs once, sized
+    for the largest top_n that needs it, and every pantry is ranked against the
+    union of all candidates from its own source with its own restrictions applied. One line per
+    request_id carries its recipes (or an error), then one line per recipe as
+    its instructions arrive, listing the requests it belongs to.
+    """
+    groups = {}
+    for item in batch.requests:
+        groups.setdefault(recommendation_key(item), []).append(item)
+    queries = [(items[0], [i.request_id for i in items]) for items in groups.values()]
+    pantries = [normalize_ingredients(query.ingredients) for query, _ in queries]
+    keys = [search_key(query, pantry) for (query, _), pantry in zip(queries, pantries)]
+
+    searches = {}
+    for (query, _), pantry, key in zip(queries, pantries, keys):
+        number = max(query.top_n * 5, searches[key][2] if key in searches else 0)
+        searches[key] = (query, pantry, number)
+    batch_queries.labels("requested").inc(len(batch.requests))
+    batch_queries.labels("distinct").inc(len(queries))
+    batch_queries.labels("searches").inc(len(searches))
+
+    # bulk refreshes spend the background share of the quota, never the interactive reserve
+    with metrics.stage("fetch"):
+        futures = {key: batch_pool.submit(fetch_candidates, *search, BACKGROUND) for key, search in searches.items()}
+        fetched, failures = {}, {}
+        for key, future in futures.items():
+            try:
+                fetched[key] = future.result()
+            except HTTPException as e:
+                failures[key] = e
+            except Exception as e:
+                # e.g. an unreadable local corpus; the 200 is already out, so report it per request
+                print(f"Batch search failed: {e}")
+                failures[key] = HTTPException(status_code=500, detail=f"Error fetching recipes: {e}")
+
+    with metrics.stage("filter"):
+        # candidates are pooled per source, so an "api" request never gets corpus recipes and vice versa
+        pools = {}
+        for key, results in fetched.items():
+            pool = pools.setdefault(searches[key][0].source, {})
+            pool.update((r.get("id"), r) for r in results)
+        views = {source: build_views(list(pool.values())) for source, pool in pools.items()}
+        masks = [
+            None if key in failures else compile_restrictions(request_restrictions(query)).mask(views[query.source])
+            for (query, _), key in zip(queries, keys)
+        ]
+
+    with metrics.stage("rank"):
+        # one matrix per source and ranking engine over the shared candidates, scored once per distinct query
+        matrices = {}
+        ranked = []
+        for (query, _), pantry, key, allowed in zip(queries, pantries, keys, masks):
+            if key in failures:
+                ranked.append(None)
+                continue
+            matrix_key = (query.source, query.ranker)
+            if matrix_key not in matrices:
+                matrices[matrix_key] = RANKERS[query.ranker](views[query.source])
+            ranked.append(matrices[matrix_key].rank(pantry, query.top_n, allowed))
+
+    wanted = {}
+    for (query, request_ids), key, entries in zip(queries, keys, ranked):
+        if entries is None:
+            error = failures[key]
+            for request_id in request_ids:
+                yield json.dumps({"type": "error", "request_id": request_id, "status": error.status_code,
+                                  "detail": error.detail}) + "\n"
+            continue
+
+        summaries = [summarize_ranked(entry) for entry in entries]
+        for request_id in request_ids:
+            yield json.dumps({"type": "recipes", "request_id": request_id, "recipes": summaries}) + "\n"
+        if query.include_instructions:
+            for entry in entries:
+                recipe, recipe_request_ids = wanted.setdefault(entry["recipe"].get("id"), (entry["recipe"], []))
+                recipe_request_ids.extend(request_ids)
+
+    # each recipe's instructions are fetched and sent once, however many requests ranked it
+    batch_recipes = [recipe for recipe, _ in wanted.values()]
+    for recipe_id, instructions in iter_instructions(batch_recipes, batch_pool, BATCH_MAX_WORKERS):
+        yield json.dumps({"type": "instructions", "id": recipe_id, "request_ids": wanted[recipe_id][1],
+                          "instructions": instructions}) + "\n"
+
+
+@app.post("/recommendations/batch")
+def recommend_batch(batch: BatchRecommendationRequest):
+    if len(batch.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_REQUESTS} requests per batch")
+    request_ids = [item.request_id for item in batch.requests]
+    if len(set(request_ids)) != len(request_ids):
+        raise HTTPException(status_code=422, detail="request_id values must be unique")
+    return StreamingResponse(stream_batch(batch), media_type="application/x-ndjson")
+
+
+@app.get("/recipe/{recipe_id}/instructions")
+def recipe_instructions(recipe_id: int, request: Request):
+    """Formatted instructions for one recipe, cacheable by browsers and proxies via a strong ETag."""
+    # upstream failures raise 502/503, so only a recipe Spoonacular doesn't know is a 404
+    data = fetch_recipe_instructions(recipe_id, priority=INTERACTIVE, raise_errors=True)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Instructions not found")
+
+    body = json.dumps(format_recipe_instructions(data), separators=(",", ":"))
+    headers = {
+        "ETag": '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"',
+        "Cache-Control": f"public, max-age={INSTRUCTIONS_MAX_AGE}",
+    }
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or headers["ETag"] in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {
+        "complex_search": search_cache.stats(),
+        "instructions": instruction_store.stats()
+    }
+
+
+@app.get("/recommendations/stats")
+def recommendation_stats():
+    return recommendation_flight.stats()
+
+
+@app.get("/http/stats")
+def http_stats():
+    return {**http_client.connection_stats(), "spoonacular": recorder.stats(), "quota": quota.stats()}
@@ -0,0 +1,61 @@
+"""Per-request stage timers, exported through prometheus_client.
+
+Counters and histograms are plain `prometheus_client` metrics, served from
+`/metrics` with `generate_latest()`. Stage timings of the current request are
+also sent back in a `Server-Timing` header, so a single slow response shows
+where its time went in the browser's devtools.
+
+The web-app keeps an identical copy of this module (web-app/metrics.py)
+since each service is built from its own Docker context.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Histogram
+
+# seconds; covers in-process stages (sub-millisecond) up to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+stage_seconds = Histogram("stage_duration_seconds", "Time spent in each request stage.", ["stage"],
+                          buckets=DEFAULT_BUCKETS)
+
+
+class StageTimer:
+    """Durations of the named stages of one request, in the order they ran."""
+
+    def __init__(self):
+        self.stages = []
+
+    def add(self, name, seconds):
+        self.stages.append((name, seconds))
+
+    def server_timing(self, total=None):
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages]
+        if total is not None:
+            entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current_timer = contextvars.ContextVar("stage_timer", default=None)
+
+
+def start_request():
+    """Begin collecting stage timings for the current request (context)."""
+    timer = StageTimer()
+    _current_timer.set(timer)
+    return timer
+
+
+@contextmanager
+def stage(name):
+    """Time a block as one stage: recorded in the stage histogram and the current request's timer."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        stage_seconds.labels(name).observe(seconds)
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.add(name, seconds)
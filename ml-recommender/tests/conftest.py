@@ -0,0 +1,18 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from service.external.spoonacular_api import instruction_store, quota, search_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Cached upstream responses and spent quota must not leak between tests."""
+    search_cache.clear()
+    instruction_store.clear()
+    quota.reset()
+    yield
+    search_cache.clear()
+    instruction_store.clear()
@@ -32,7 +32,7 @@ def test_app_loads():
     assert app is not None
 
 #test - returns data
-@patch('service.external.spoonacular_api.requests.get')
+@patch('service.external.spoonacular_api.http_client.get')
 def test_recommendations_endpoint_works(mock_get):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -62,7 +62,7 @@ def test_recommendations_endpoint_works(mock_get):
     assert len(data) > 0
 
 #test - dietary filters
-@patch('service.external.spoonacular_api.requests.get')
+@patch('service.external.spoonacular_api.http_client.get')
 def test_dietary_filtering_works(mock_get):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -94,7 +94,7 @@ def test_dietary_filtering_works(mock_get):
     assert len(data) > 0
 
 #test - intolerances
-@patch('service.external.spoonacular_api.requests.get')
+@patch('service.external.spoonacular_api.http_client.get')
 def test_intolerance_filtering_works(mock_get):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -122,7 +122,7 @@ def test_intolerance_filtering_works(mock_get):
     assert response.status_code == 200
 
 #test - excluded ingredients
-@patch('service.external.spoonacular_api.requests.get')
+@patch('service.external.spoonacular_api.http_client.get')
 def test_excluded_ingredients_works(mock_get):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -139,7 +139,7 @@ def test_excluded_ingredients_works(mock_get):
     assert response.status_code == 200
 
 #test recs with multiple filters
-@patch('service.external.spoonacular_api.requests.get')
+@patch('service.external.spoonacular_api.http_client.get')
 def test_recommendations_with_all_filters(mock_get):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -158,7 +158,7 @@ def test_recommendations_with_all_filters(mock_get):
     assert response.status_code == 200
 
 #multiple dietary restrictions
-@patch('service.external.spoonacular_api.requests.get')
+@patch('service.external.spoonacular_api.http_client.get')
 def test_recommendations_multiple_dietary_filters(mock_get):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -175,7 +175,7 @@ def test_recommendations_multiple_dietary_filters(mock_get):
     assert response.status_code == 200
 
 #multiple intolerances
-@patch('service.external.spoonacular_api.requests.get')
+@patch('service.external.spoonacular_api.http_client.get')
 def test_recommendations_multiple_intolerances(mock_get):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -191,3 +191,297 @@ def test_recommendations_multiple_intolerances(mock_get):
     
     assert response.status_code == 200
 
+
+#instructions are fetched in concurrent bulk chunks but keep ranking order
+@patch('service.main.INSTRUCTIONS_CHUNK_SIZE', 2)
+@patch('service.main.fetch_recipe_instructions_bulk')
+def test_enrich_recipes_keeps_order(mock_bulk):
+    import time
+    from service.main import enrich_recipes
+
+    def _slow_first(recipe_ids, timeout):
+        time.sleep(0.05 if 1 in recipe_ids else 0)
+        return {i: [{"name": f"recipe {i}", "steps": []}] for i in recipe_ids}
+    mock_bulk.side_effect = _slow_first
+
+    result = enrich_recipes([{"id": 1}, {"id": 2}, {"id": 3}])
+
+    assert [r[0]["name"] for r in result] == ["recipe 1", "recipe 2", "recipe 3"]
+    assert sorted(c[0][0] for c in mock_bulk.call_args_list) == [[1, 2], [3]]
+
+#streaming sends summaries first, then instructions per recipe
+@patch('service.main.fetch_recipe_instructions_bulk')
+@patch('service.external.spoonacular_api.http_client.get')
+def test_recommendations_stream(mock_get, mock_bulk):
+    import json
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.raise_for_status = Mock()
+    mock_response.json.return_value = {
+        "results": [
+            {"id": 1, "title": "Rice Bowl", "usedIngredients": [{"name": "rice"}], "missedIngredients": []},
+            {"id": 2, "title": "Fried Rice", "usedIngredients": [{"name": "rice"}], "missedIngredients": []}
+        ]
+    }
+    mock_get.return_value = mock_response
+    mock_bulk.side_effect = lambda recipe_ids, timeout: {i: [{"name": f"steps {i}", "steps": []}] for i in recipe_ids}
+
+    response = client.post("/recommendations/stream", json={"ingredients": ["rice"]})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["type"] == "recipes"
+    assert [r["id"] for r in lines[0]["recipes"]] == [1, 2]
+    assert "instructions" not in lines[0]["recipes"][0]
+    assert sorted(line["id"] for line in lines[1:]) == [1, 2]
+    assert all(line["type"] == "instructions" for line in lines[1:])
+
+#per-recipe instructions support conditional GET
+@patch('service.external.spoonacular_api.http_client.get')
+def test_recipe_instructions_etag(mock_get):
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.raise_for_status = Mock()
+    mock_response.json.return_value = [
+        {"name": "Main", "steps": [{"number": 1, "step": "Boil water.", "ingredients": [], "equipment": []}]}
+    ]
+    mock_get.return_value = mock_response
+
+    response = client.get("/recipe/55/instructions")
+    assert response.status_code == 200
+    assert response.json()[0]["steps"][0]["instruction"] == "Boil water."
+    etag = response.headers["etag"]
+    assert "max-age" in response.headers["cache-control"]
+
+    cached = client.get("/recipe/55/instructions", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert mock_get.call_count == 1
+
+#upstream failures are 502/503, only a recipe Spoonacular doesn't know is a 404
+@patch('service.external.spoonacular_api.http_client.get')
+def test_recipe_instructions_upstream_errors(mock_get):
+    import requests
+
+    mock_get.side_effect = requests.ConnectionError("connection reset")
+    assert client.get("/recipe/56/instructions").status_code == 502
+
+    throttled = Mock()
+    throttled.status_code = 429
+    throttled.raise_for_status.side_effect = requests.HTTPError("429", response=throttled)
+    mock_get.side_effect = None
+    mock_get.return_value = throttled
+    response = client.get("/recipe/57/instructions")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "60"
+
+    missing = Mock()
+    missing.status_code = 404
+    missing.raise_for_status.side_effect = requests.HTTPError("404", response=missing)
+    mock_get.return_value = missing
+    assert client.get("/recipe/58/instructions").status_code == 404
+
+#summaries only when instructions are loaded lazily
+@patch('service.main.fetch_recipe_instructions_bulk')
+@patch('service.external.spoonacular_api.http_client.get')
+def test_recommendations_without_instructions(mock_get, mock_bulk):
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.raise_for_status = Mock()
+    mock_response.json.return_value = {"results": [{"id": 1, "title": "Rice Bowl"}]}
+    mock_get.return_value = mock_response
+
+    response = client.post("/recommendations", json={"ingredients": ["rice"], "include_instructions": False})
+
+    assert response.status_code == 200
+    assert "instructions" not in response.json()[0]
+    mock_bulk.assert_not_called()
+
+#stage timings come back as Server-Timing and show up in /metrics
+@patch('service.external.spoonacular_api.http_client.get')
+def test_server_timing_and_metrics(mock_get):
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.raise_for_status = Mock()
+    mock_response.json.return_value = {"results": [{"id": 1, "title": "Rice Bowl"}]}
+    mock_get.return_value = mock_response
+
+    response = client.post("/recommendations", json={"ingredients": ["rice"], "include_instructions": False})
+
+    stages = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    assert stages == ["normalize", "fetch", "validate", "filter", "rank", "total"]
+
+    metrics = client.get("/metrics")
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert 'stage_duration_seconds_count{stage="fetch"}' in metrics.text
+    assert 'upstream_requests_total{endpoint="complexSearch",outcome="2xx"}' in metrics.text
+    assert 'http_requests_total{method="POST",route="/recommendations",status="200"}' in metrics.text
+
+#only the ranked top_n are enriched, and they carry the scorer's fields
+@patch('service.main.fetch_recipe_instructions_bulk')
+@patch('service.external.spoonacular_api.http_client.get')
+def test_enriches_only_ranked_top_n(mock_get, mock_bulk):
+    def recipe(recipe_id, used, missed):
+        return {"id": recipe_id, "title": f"Recipe {recipe_id}",
+                "usedIngredients": [{"name": n} for n in used],
+                "missedIngredients": [{"name": n} for n in missed]}
+
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.raise_for_status = Mock()
+    mock_response.json.return_value = {"results": [
+        recipe(1, ["rice"], ["soy sauce", "egg", "scallion"]),
+        recipe(2, ["rice", "chicken"], []),
+        recipe(3, ["rice", "chicken"], ["peanut"]),
+        recipe(4, ["chicken"], ["garlic"]),
+    ]}
+    mock_get.return_value = mock_response
+    mock_bulk.side_effect = lambda recipe_ids, timeout: {i: [] for i in recipe_ids}
+
+    response = client.post("/recommendations", json={
+        "ingredients": ["rice", "chicken"], "top_n": 2, "intolerances": ["peanut"]
+    })
+
+    data = response.json()
+    assert [r["id"] for r in data] == [2, 4]
+    assert data[0]["match_percentage"] == 100.0
+    assert data[0]["total_ingredients"] == 2
+    assert data[1]["score"] == 0.5
+    assert mock_bulk.call_args[0][0] == [2, 4]
+
+#the tfidf ranker scores by cosine similarity, so a rare ingredient outweighs a staple
+@patch('service.external.spoonacular_api.http_client.get')
+def test_tfidf_ranker(mock_get):
+    def recipe(recipe_id, names):
+        return {"id": recipe_id, "title": f"Recipe {recipe_id}", "extendedIngredients": [{"name": n} for n in names]}
+
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.raise_for_status = Mock()
+    mock_response.json.return_value = {"results": [
+        recipe(1, ["salt", "water", "flour"]),
+        recipe(2, ["salmon", "lemon", "dill"]),
+        recipe(3, ["salt", "water", "rice"]),
+        recipe(4, ["salt", "water", "pasta"]),
+        recipe(5, ["salt", "water", "yeast"]),
+        recipe(6, ["salt", "water", "sugar"]),
+    ]}
+    mock_get.return_value = mock_response
+
+    body = {"ingredients": ["salt", "water", "salmon"], "top_n": 1, "include_instructions": False}
+    count = client.post("/recommendations", json=body).json()
+    tfidf = client.post("/recommendations", json={**body, "ranker": "tfidf"}).json()
+
+    assert count[0]["id"] == 1
+    assert tfidf[0]["id"] == 2
+    assert 0 < tfidf[0]["score"] <= 1
+    assert client.post("/recommendations", json={**body, "ranker": "bm25"}).status_code == 422
+
+#a batch searches once per distinct pantry and ranks every pantry against all candidates
+@patch('service.main.enrich_pool.submit', side_effect=AssertionError("batch work must stay off the interactive pool"))
+@patch('service.main.fetch_recipe_instructions_bulk')
+@patch('service.external.spoonacular_api.http_client.get')
+def test_batch_shares_searches_and_instructions(mock_get, mock_bulk, mock_enrich_submit):
+    import json
+
+    def recipe(recipe_id, names):
+        return {"id": recipe_id, "title": f"Recipe {recipe_id}", "extendedIngredients": [{"name": n} for n in names]}
+
+    results = {
+        "rice": [recipe(1, ["rice", "egg"]), recipe(2, ["rice", "peanut"])],
+        "chicken": [recipe(3, ["chicken", "rice"])],
+    }
+
+    def search(url, params=None, **kwargs):
+        response = Mock()
+        response.status_code = 200
+        response.json.return_value = {"results": results[params["includeIngredients"]]}
+        return response
+
+    mock_get.side_effect = search
+    mock_bulk.side_effect = lambda recipe_ids, timeout: {i: [] for i in recipe_ids}
+
+    response = client.post("/recommendations/batch", json={"requests": [
+        {"request_id": "a", "ingredients": ["rice"], "top_n": 2},
+        {"request_id": "b", "ingredients": ["Rice "], "top_n": 2},
+        {"request_id": "c", "ingredients": ["chicken"], "top_n": 2, "intolerances": ["peanut"]},
+    ]})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    recipes = {l["request_id"]: [r["id"] for r in l["recipes"]] for l in lines if l["type"] == "recipes"}
+    instructions = {l["id"]: l["request_ids"] for l in lines if l["type"] == "instructions"}
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert mock_get.call_count == 2
+    assert recipes["a"] == recipes["b"]
+    # c ranks against the rice search's candidates too, minus the peanut recipe
+    assert recipes["c"] == [3, 1]
+    assert mock_bulk.call_count == 1
+    assert sorted(mock_bulk.call_args[0][0]) == sorted(instructions)
+    assert sorted(instructions[3]) == ["c"]
+
+
+@patch('service.external.spoonacular_api.http_client.get')
+def test_batch_reports_failed_searches_per_request(mock_get):
+    import json
+    import requests
+
+    mock_get.side_effect = requests.ConnectionError("down")
+
+    response = client.post("/recommendations/batch", json={"requests": [
+        {"request_id": "a", "ingredients": ["rice"], "include_instructions": False},
+    ]})
+
+    line = json.loads(response.text)
+    assert line["type"] == "error" and line["request_id"] == "a" and line["status"] == 500
+    duplicate = {"request_id": "a", "ingredients": ["rice"]}
+    assert client.post("/recommendations/batch", json={"requests": [duplicate, duplicate]}).status_code == 422
+
+#upstream failures surface as a status code before any stream starts
+@patch('service.external.spoonacular_api.http_client.get')
+def test_recommendations_stream_upstream_failure_is_5xx(mock_get):
+    import requests
+    mock_get.side_effect = requests.ConnectionError("down")
+
+    response = client.post("/recommendations/stream", json={"ingredients": ["rice"]})
+
+    assert response.status_code == 500
+
+
+@patch('service.main.get_corpus', side_effect=ValueError("corrupt corpus"))
+def test_batch_reports_unexpected_search_errors(mock_corpus):
+    import json
+
+    response = client.post("/recommendations/batch", json={"requests": [
+        {"request_id": "a", "ingredients": ["rice"], "source": "local"},
+    ]})
+
+    line = json.loads(response.text)
+    assert line == {"type": "error", "request_id": "a", "status": 500,
+                    "detail": "Error fetching recipes: corrupt corpus"}
+
+
+#batch items only rank candidates from the source they asked for
+@patch('service.main.get_corpus')
+@patch('service.external.spoonacular_api.http_client.get')
+def test_batch_keeps_sources_apart(mock_get, mock_corpus):
+    import json
+    from service.corpus import RecipeCorpus
+
+    corpus = RecipeCorpus()
+    corpus.add({"id": 10, "title": "Local Rice", "extendedIngredients": [{"name": "rice"}]})
+    mock_corpus.return_value = corpus
+    mock_get.return_value.status_code = 200
+    mock_get.return_value.json.return_value = {
+        "results": [{"id": 1, "title": "Api Rice", "extendedIngredients": [{"name": "rice"}]}]
+    }
+
+    response = client.post("/recommendations/batch", json={"requests": [
+        {"request_id": "api", "ingredients": ["rice"], "include_instructions": False},
+        {"request_id": "local", "ingredients": ["rice"], "source": "local", "include_instructions": False},
+    ]})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    recipes = {l["request_id"]: [r["id"] for r in l["recipes"]] for l in lines}
+    assert recipes == {"api": [1], "local": [10]}
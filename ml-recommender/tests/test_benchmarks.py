@@ -0,0 +1,45 @@
+import requests
+
+from benchmarks.bench_rankers import bench_quality
+from benchmarks.fake_upstream import FakeSpoonacular
+from benchmarks.run import compare
+from benchmarks.synthetic import make_pantry, make_recipes
+from logic.scorer import rank_recipes
+
+
+def test_synthetic_recipes_are_seeded():
+    pantry = make_pantry(seed=3)
+    recipes = make_recipes(50, seed=3, pantry=pantry)
+
+    assert recipes == make_recipes(50, seed=3, pantry=pantry)
+    assert recipes != make_recipes(50, seed=4, pantry=pantry)
+    assert all(r["usedIngredients"] or r["missedIngredients"] for r in recipes)
+    assert len(rank_recipes(recipes, pantry, top_n=5)) == 5
+
+
+def test_fake_upstream_serves_search_and_instructions():
+    upstream = FakeSpoonacular().start()
+    try:
+        search = requests.get(f"{upstream.base_url}/recipes/complexSearch",
+                              params={"includeIngredients": "garlic,rice", "number": 4}).json()
+        recipe_id = search["results"][0]["id"]
+        steps = requests.get(f"{upstream.base_url}/recipes/{recipe_id}/analyzedInstructions").json()
+        missing = requests.get(f"{upstream.base_url}/recipes/food")
+    finally:
+        upstream.stop()
+
+    assert len(search["results"]) == 4
+    assert steps[0]["steps"][0]["number"] == 1
+    assert missing.status_code == 404
+    assert upstream.requests == 3
+
+
+def test_compare_skips_new_measurements():
+    rows = compare({"a": 2.0, "b": 1.0}, {"a": 1.0})
+    assert rows == [("a", 1.0, 2.0, 1.0)]
+
+
+def test_ranker_quality_is_measured_per_engine():
+    results = bench_quality(n_recipes=200, n_pantries=5)
+    assert set(results) == {"rankers/count/precision_at_10", "rankers/tfidf/precision_at_10", "rankers/overlap_at_10"}
+    assert all(0 <= v <= 1 for v in results.values())
@@ -0,0 +1,113 @@
+from unittest.mock import MagicMock, patch
+
+from service.cache import InstructionStore, LRUCache, TieredCache
+from service.external.spoonacular_api import get_recipes_by_ingredients, search_cache, search_cache_key
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+@patch("service.cache.time.monotonic")
+def test_lru_expires_entries(mock_time):
+    mock_time.return_value = 100
+    cache = LRUCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+
+    mock_time.return_value = 111
+    assert cache.get("a") is None
+
+
+@patch("service.cache.time.monotonic")
+def test_instruction_store_keeps_instructions_and_expires_empty_entries(mock_time):
+    mock_time.return_value = 100
+    store = InstructionStore(negative_ttl=10)
+    store.set(1, [{"name": "", "steps": []}])
+    store.set(2, [])
+
+    mock_time.return_value = 100 + 365 * 86400
+    assert store.get(1) == [{"name": "", "steps": []}]
+    assert store.get(2) is None
+
+
+def test_tiered_cache_promotes_shared_hits():
+    cache = TieredCache("test", maxsize=2, ttl=60)
+    cache.shared = MagicMock()
+    cache.shared.get.return_value = ["from mongo"]
+
+    assert cache.get("key") == ["from mongo"]
+    assert cache.get("key") == ["from mongo"]
+    cache.shared.get.assert_called_once_with("key")
+    assert cache.stats()["shared_hits"] == 1
+    assert cache.stats()["local_hits"] == 1
+
+
+def test_search_cache_key_is_canonical():
+    assert search_cache_key(["Rice", " chicken"], 10, ["Vegan"]) == search_cache_key(["chicken", "rice", "rice"], 10, ["vegan"])
+    assert search_cache_key(["chicken"], 10) != search_cache_key(["chicken"], 20)
+
+
+@patch("service.external.spoonacular_api.http_client.get")
+def test_search_results_are_cached(mock_get):
+    mock_resp = MagicMock()
+    mock_resp.json.return_value = {"results": [{"id": 1}]}
+    mock_resp.raise_for_status = lambda: None
+    mock_get.return_value = mock_resp
+
+    assert get_recipes_by_ingredients(["rice", "chicken"], 5) == [{"id": 1}]
+    assert get_recipes_by_ingredients(["Chicken", "rice"], 5) == [{"id": 1}]
+    assert mock_get.call_count == 1
+
+    get_recipes_by_ingredients(["rice", "chicken"], 5, use_cache=False)
+    assert mock_get.call_count == 2
+    assert search_cache.stats()["misses"] == 1
+
+
+@patch("service.external.spoonacular_api.http_client.get")
+def test_instructions_are_fetched_once_per_recipe(mock_get):
+    from service.external.spoonacular_api import get_recipe_instructions, instruction_store
+
+    found = MagicMock()
+    found.json.return_value = [{"name": "", "steps": []}]
+    found.raise_for_status = lambda: None
+    empty = MagicMock()
+    empty.json.return_value = []
+    empty.raise_for_status = lambda: None
+    mock_get.side_effect = [found, empty]
+
+    assert get_recipe_instructions(1) == [{"name": "", "steps": []}]
+    assert get_recipe_instructions(1) == [{"name": "", "steps": []}]
+    # recipes without instructions are negatively cached
+    assert get_recipe_instructions(2) == []
+    assert get_recipe_instructions(2) == []
+
+    assert mock_get.call_count == 2
+    assert instruction_store.stats()["negative_hits"] == 1
+
+
+@patch("service.external.spoonacular_api.http_client.get")
+def test_bulk_instructions_fill_the_store(mock_get):
+    from service.external.spoonacular_api import get_recipe_instructions_bulk, stored_instructions
+
+    bulk = MagicMock()
+    bulk.json.return_value = [
+        {"id": 1, "analyzedInstructions": [{"name": "", "steps": []}]},
+        {"id": 2, "analyzedInstructions": []},
+    ]
+    bulk.raise_for_status = lambda: None
+    mock_get.return_value = bulk
+
+    assert get_recipe_instructions_bulk([1, 2, 3]) == {1: [{"name": "", "steps": []}], 2: []}
+    assert mock_get.call_count == 1
+    assert mock_get.call_args[1]["params"]["ids"] == "1,2,3"
+
+    # 3 wasn't returned, so it's still unknown rather than negatively cached
+    assert stored_instructions([1, 2, 3]) == ({1: [{"name": "", "steps": []}], 2: []}, [3])
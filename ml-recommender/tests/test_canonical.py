@@ -0,0 +1,46 @@
+from logic.filters import has_excluded
+from logic.scorer import rank_recipes
+from service.external.spoonacular_api import search_cache_key
+from utils.canonical import canonical_ingredient, singularize
+from utils.preprocessing import normalize_ingredients
+
+
+def test_spellings_of_one_ingredient_share_a_name():
+    for name in ["tomato", "Tomatoes", "Roma tomatoes, diced", "cherry tomatoes", "fresh tomato"]:
+        assert canonical_ingredient(name) == "tomato"
+    assert canonical_ingredient("Scallions") == "green onion"
+    assert canonical_ingredient("Extra-virgin olive oil") == "olive oil"
+    assert canonical_ingredient("all-purpose flour") == "flour"
+    assert canonical_ingredient("tiger prawns") == "tiger shrimp"
+
+
+def test_modifiers_only_drop_while_a_word_is_left():
+    assert canonical_ingredient("chopped fresh basil") == "basil"
+    assert canonical_ingredient("fresh") == "fresh"
+
+
+def test_only_whole_phrases_and_names_are_rewritten():
+    assert canonical_ingredient("low fat milk") == "low fat milk"
+    assert canonical_ingredient("low sodium soy sauce") == "soy sauce"
+    assert canonical_ingredient("mince") == "ground beef"
+    assert canonical_ingredient("mince pies") == "mince pie"
+
+
+def test_singularize_leaves_non_plurals_alone():
+    assert singularize("berries") == "berry"
+    assert singularize("peaches") == "peach"
+    assert singularize("leaves") == "leaf"
+    for word in ["asparagus", "hummus", "swiss", "grass", "egg"]:
+        assert singularize(word) == word
+
+
+def test_pantry_spellings_share_cache_keys():
+    assert normalize_ingredients(["Tomatoes", "Scallions"]) == ["tomato", "green onion"]
+    assert search_cache_key(["Tomatoes", "scallion"], 5) == search_cache_key(["green onions", "tomato"], 5)
+
+
+def test_scorer_and_filters_match_canonical_names():
+    recipe = {"id": 1, "extendedIngredients": [{"name": "cherry tomatoes"}, {"name": "spring onions"}]}
+    ranked = rank_recipes([recipe], ["Tomato", "scallions"])
+    assert ranked[0]["matched_ingredients"] == 2
+    assert has_excluded(recipe, ["Scallion"])
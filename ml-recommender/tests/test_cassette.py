@@ -0,0 +1,66 @@
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from service.external.cassette import CassetteStore, Recorder, normalize_request, to_response
+
+
+def upstream_response(body, status=200):
+    return to_response({"status": status, "body": body}, "https://api.spoonacular.com/x")
+
+
+def test_normalized_request_ignores_api_key_and_set_order():
+    a = normalize_request("get", "https://api.spoonacular.com/recipes/complexSearch",
+                          {"apiKey": "one", "includeIngredients": "Rice,garlic", "number": 5, "fillIngredients": True})
+    b = normalize_request("GET", "http://127.0.0.1:8081/recipes/complexSearch",
+                          {"number": "5", "fillIngredients": "true", "includeIngredients": "garlic, rice", "apiKey": "two"})
+    assert a == b
+
+
+def test_record_then_replay(tmp_path):
+    store = CassetteStore(str(tmp_path))
+    live_get = Mock(return_value=upstream_response('{"results": [{"id": 1}]}'))
+    url = "https://api.spoonacular.com/recipes/complexSearch"
+
+    recorder = Recorder(live_get, mode="record", store=store)
+    recorder.get(url, params={"apiKey": "k", "includeIngredients": "rice"})
+    assert len(store) == 1
+
+    replayer = Recorder(Mock(side_effect=AssertionError("no network in replay")), mode="replay", store=store)
+    response = replayer.get(url, params={"apiKey": "other", "includeIngredients": "rice"})
+    assert response.status_code == 200
+    assert response.json() == {"results": [{"id": 1}]}
+
+    with pytest.raises(requests.ConnectionError):
+        replayer.get(url, params={"includeIngredients": "tofu"})
+    assert replayer.stats()["replayed"] == 1
+    assert replayer.stats()["misses"] == 1
+
+
+def test_record_skips_server_errors(tmp_path):
+    store = CassetteStore(str(tmp_path))
+    recorder = Recorder(Mock(return_value=upstream_response("{}", status=502)), mode="record", store=store)
+    recorder.get("https://api.spoonacular.com/recipes/1/analyzedInstructions")
+    assert len(store) == 0
+
+
+def test_record_keeps_only_successes_and_not_found(tmp_path):
+    store = CassetteStore(str(tmp_path))
+    for recipe_id, status in enumerate([401, 402, 429, 404, 200]):
+        recorder = Recorder(Mock(return_value=upstream_response("{}", status=status)), mode="record", store=store)
+        recorder.get(f"https://api.spoonacular.com/recipes/{recipe_id}/analyzedInstructions")
+    assert len(store) == 2
+
+
+def test_replay_injects_errors(tmp_path):
+    replayer = Recorder(Mock(), mode="replay", store=CassetteStore(str(tmp_path)), error_rate=1.0)
+    response = replayer.get("https://api.spoonacular.com/recipes/1/analyzedInstructions")
+    assert response.status_code == 503
+    with pytest.raises(requests.HTTPError):
+        response.raise_for_status()
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        Recorder(Mock(), mode="offline")
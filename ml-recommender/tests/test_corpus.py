@@ -0,0 +1,125 @@
+import json
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from service import corpus as corpus_module
+from service.corpus import RecipeCorpus, main as corpus_cli
+from service.main import app
+
+client = TestClient(app)
+
+recipes = [
+    {"id": 1, "title": "Chicken Rice", "extendedIngredients": [{"name": "Chicken Breast"}, {"name": "rice"}]},
+    {"id": 2, "title": "Olive Salad", "extendedIngredients": [{"name": "extra virgin olive oil"}, {"name": "lettuce"}]},
+    {"id": 3, "title": "Fried Rice", "usedIngredients": [{"name": "rice"}], "missedIngredients": [{"name": "egg"}]},
+]
+
+
+def build_corpus():
+    corpus = RecipeCorpus()
+    for r in recipes:
+        corpus.add(r)
+    return corpus
+
+
+def test_postings_intersect_words_of_a_pantry_item():
+    corpus = build_corpus()
+    assert corpus.postings("olive oil") == {2}
+    assert corpus.postings("chicken") == {1}
+    assert corpus.postings("peanut oil") == set()
+
+
+def test_candidates_rank_by_pantry_hits():
+    corpus = build_corpus()
+    candidates = corpus.candidates(["rice", "chicken"], limit=5)
+    assert [r["id"] for r in candidates] == [1, 3]
+
+
+def test_search_marks_used_and_missed_ingredients():
+    results = build_corpus().search(["rice"], 5)
+    fried_rice = next(r for r in results if r["id"] == 3)
+    assert fried_rice["usedIngredients"] == [{"name": "rice"}]
+    assert fried_rice["missedIngredients"] == [{"name": "egg"}]
+
+
+def test_ingest_round_trips_through_disk(tmp_path):
+    dump = tmp_path / "page.json"
+    dump.write_text(json.dumps({"results": recipes}))
+    corpus_path = str(tmp_path / "corpus.json")
+
+    corpus_cli(["--corpus", corpus_path, "ingest", str(dump)])
+
+    corpus = RecipeCorpus.load(corpus_path)
+    assert len(corpus) == 3
+    assert corpus.postings("rice") == {1, 3}
+
+
+@patch("service.external.spoonacular_api.http_client.get")
+@patch("service.main.get_corpus")
+def test_local_recommendations_skip_the_api(mock_corpus, mock_get):
+    mock_corpus.return_value = build_corpus()
+    mock_get.return_value.json.return_value = []
+
+    response = client.post("/recommendations", json={"ingredients": ["Rice"], "source": "local"})
+
+    assert response.status_code == 200
+    assert {r["id"] for r in response.json()} == {1, 3}
+    assert all("complexSearch" not in call.args[0] for call in mock_get.call_args_list)
+
+
+def test_index_from_an_older_version_is_rebuilt(tmp_path):
+    corpus_path = tmp_path / "corpus.json"
+    corpus_path.write_text(json.dumps({"recipes": recipes, "index": {"chicken breast": [1]}}))
+
+    corpus = RecipeCorpus.load(str(corpus_path))
+    assert "chicken breast" not in corpus.index
+    assert corpus.postings("Chicken breasts") == {1}
+
+
+def test_lsh_candidates_are_rescored_exactly():
+    corpus = build_corpus()
+    corpus.add({"id": 4, "title": "Chicken Soup", "extendedIngredients": [{"name": "chicken"}, {"name": "carrot"}]})
+
+    approximate = corpus.approximate_candidates(["chicken", "rice"], limit=2)
+    assert [r["id"] for r in approximate] == [1, 3]
+    assert corpus.approximate_candidates(["saffron"], limit=2) == []
+    # recipes added after the index is built are found too
+    corpus.add({"id": 5, "title": "Saffron Rice", "extendedIngredients": [{"name": "saffron"}]})
+    assert [r["id"] for r in corpus.search(["saffron"], 2, approximate=True)] == [5]
+
+
+@patch("service.external.spoonacular_api.http_client.get")
+@patch("service.main.get_corpus")
+def test_local_diet_is_applied_before_truncating(mock_corpus, mock_get):
+    corpus = RecipeCorpus()
+    # better pantry matches that aren't keto would fill every slot if the diet came last
+    for i in range(50):
+        corpus.add({"id": i, "title": f"Rice {i}", "extendedIngredients": [{"name": "rice"}, {"name": "egg"}]})
+    for i in range(100, 200):
+        corpus.add({"id": i, "title": f"Keto {i}", "ketogenic": True,
+                    "extendedIngredients": [{"name": "egg"}, {"name": "bacon"}, {"name": "butter"}]})
+    mock_corpus.return_value = corpus
+
+    assert len(corpus.search(["rice", "egg"], 5, diet=["ketogenic"])) == 5
+    assert len(corpus.search(["rice", "egg"], 5, diet=["ketogenic"], approximate=True)) == 5
+
+    response = client.post("/recommendations", json={
+        "ingredients": ["rice", "egg"], "dietary": ["ketogenic"], "top_n": 5, "source": "local",
+        "include_instructions": False,
+    })
+    assert [r["id"] >= 100 for r in response.json()] == [True] * 5
+
+
+def test_lsh_is_built_with_the_corpus_load(tmp_path):
+    corpus_path = str(tmp_path / "corpus.json")
+    build_corpus().save(corpus_path)
+
+    with patch.object(corpus_module, "CORPUS_PATH", corpus_path), patch.object(corpus_module, "_corpus", None):
+        with patch.object(corpus_module, "CORPUS_LSH_MIN_RECIPES", 0):
+            assert corpus_module.get_corpus()._lsh is None
+        corpus_module._corpus = None
+        with patch.object(corpus_module, "CORPUS_LSH_MIN_RECIPES", 3):
+            corpus = corpus_module.get_corpus()
+            assert len(corpus._lsh) == 3
+            assert [r["id"] for r in corpus.search(["chicken"], 2)] == [1]
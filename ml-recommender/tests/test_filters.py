@@ -0,0 +1,58 @@
+from benchmarks.bench_filters import legacy_filter, make_recipes
+from logic.filters import compile_restrictions, filter_recipes, has_excluded, has_intolerance
+
+
+def test_compiled_filter_matches_legacy_loops():
+    recipes = make_recipes(300, seed=3)
+    restrictions = {"intolerances": ["dairy", "shellfish", "sesame"], "excluded_ingredients": ["Garlic "]}
+    assert filter_recipes(recipes, restrictions) == legacy_filter(recipes, {
+        "intolerances": ["dairy", "shellfish", "sesame"],
+        "excluded_ingredients": ["garlic"],
+    })
+
+
+def test_matcher_is_reusable_across_calls():
+    matcher = compile_restrictions({"diet": ["vegan"], "intolerances": ["egg"]})
+    recipes = [
+        {"id": 1, "vegan": True, "extendedIngredients": [{"name": "tofu"}]},
+        {"id": 2, "vegan": True, "extendedIngredients": [{"name": "egg noodles"}]},
+        {"id": 3, "vegan": False, "extendedIngredients": [{"name": "tofu"}]},
+    ]
+    assert [r["id"] for r in filter_recipes(recipes, matcher)] == [1]
+    assert filter_recipes(recipes[:1], matcher) == recipes[:1]
+
+
+def test_single_recipe_checks():
+    recipe = {"extendedIngredients": [{"name": "Peanut Butter"}, {"name": "bread"}]}
+    assert has_intolerance(recipe, ["Peanut"])
+    assert has_intolerance(recipe, ["dairy"])
+    assert not has_intolerance(recipe, ["shellfish"])
+    assert has_excluded(recipe, ["BREAD"])
+    assert not has_excluded({"extendedIngredients": []}, ["bread"])
+
+
+def test_exclusions_that_canonicalize_to_nothing_are_ignored():
+    from logic.filters import validate_restrictions
+
+    recipes = [{"id": 1, "extendedIngredients": [{"name": "rice"}]}]
+    restrictions = validate_restrictions({"excluded_ingredients": ["-", "鸡"]})
+    assert filter_recipes(recipes, restrictions) == recipes
+    assert not has_excluded(recipes[0], ["-"])
+
+
+def test_recipe_views_flow_through_filter_and_rank():
+    from logic.recipe_view import DIET_BITS, build_views
+    from logic.scorer import rank_recipes
+
+    recipes = [
+        {"id": 1, "glutenFree": True, "extendedIngredients": [{"name": "Rice"}, {"name": "salt"}]},
+        {"id": 2, "diets": ["Lacto Ovo Vegetarian"], "extendedIngredients": [{"name": "rice"}]},
+    ]
+    views = build_views(recipes)
+    assert views[0].diet_mask == DIET_BITS["gluten free"]
+    assert views[0].ingredients == ("rice", "salt")
+    assert views[0].ingredient_ids[0] == views[1].ingredient_ids[0]
+
+    assert [v.recipe["id"] for v in filter_recipes(views, {"diet": ["gluten free"]})] == [1]
+    assert [v.recipe["id"] for v in filter_recipes(views, {"diet": "lacto ovo vegetarian"})] == [2]
+    assert [r["recipe"]["id"] for r in rank_recipes(views, ["rice"])] == [2, 1]
@@ -0,0 +1,27 @@
+from unittest.mock import patch
+
+from service.http_client import PooledSession
+
+
+@patch("service.http_client.requests.Session.request")
+def test_default_timeout_is_applied(mock_request):
+    session = PooledSession(timeout=(1, 2))
+
+    session.get("https://example.com")
+    assert mock_request.call_args[1]["timeout"] == (1, 2)
+
+    session.get("https://example.com", timeout=7)
+    assert mock_request.call_args[1]["timeout"] == 7
+
+
+def test_adapter_retries_server_errors_but_leaves_throttling_to_the_caller():
+    session = PooledSession(pool_maxsize=4, max_retries=2)
+    adapter = session.get_adapter("https://api.spoonacular.com")
+
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.total == 2
+    assert 429 not in adapter.max_retries.status_forcelist
+    assert 503 in adapter.max_retries.status_forcelist
+    assert adapter.max_retries.backoff_max == 2
+    assert not adapter.max_retries.respect_retry_after_header
+    assert session.connection_stats() == {}
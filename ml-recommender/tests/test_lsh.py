@@ -0,0 +1,39 @@
+from service.lsh import MinHashLSH
+
+
+def test_similar_sets_share_a_bucket():
+    lsh = MinHashLSH(bands=32, rows=2)
+    lsh.add("pasta", {"pasta", "tomato", "garlic", "olive", "oil", "basil"})
+    lsh.add("curry", {"chicken", "curry", "coconut", "milk", "rice", "ginger"})
+    lsh.add("empty", set())
+
+    assert lsh.query({"pasta", "tomato", "garlic", "basil"}) == {"pasta"}
+    assert lsh.query(set()) == set()
+    assert len(lsh) == 2
+
+
+def test_similarity_estimates_jaccard():
+    lsh = MinHashLSH(bands=64, rows=4)
+    a = {f"t{i}" for i in range(100)}
+    lsh.add("a", a)
+    half = {f"t{i}" for i in range(50, 150)}
+    assert abs(lsh.similarity("a", half) - 1 / 3) < 0.1
+    assert lsh.similarity("a", a) == 1.0
+
+
+def test_more_rows_per_band_raise_the_threshold():
+    assert MinHashLSH(bands=32, rows=3).threshold > MinHashLSH(bands=32, rows=2).threshold
+    assert MinHashLSH(bands=64, rows=2).threshold < MinHashLSH(bands=32, rows=2).threshold
+
+
+def test_readding_or_removing_a_key_updates_its_buckets():
+    lsh = MinHashLSH(bands=16, rows=1)
+    query = {"a", "b", "c", "d"}
+    lsh.add(1, {"a", "b", "c", "d"})
+    lsh.add(2, {"a", "b", "c", "y"})
+    assert lsh.query(query) == {1, 2}
+
+    lsh.remove(1)
+    assert 1 not in lsh.query(query)
+    lsh.add(2, {"z"})
+    assert 2 not in lsh.query(query)
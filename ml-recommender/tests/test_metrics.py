@@ -0,0 +1,21 @@
+from prometheus_client import REGISTRY
+
+from service import metrics
+from service.metrics import StageTimer
+
+
+def test_stage_records_histogram_and_request_timer():
+    before = REGISTRY.get_sample_value("stage_duration_seconds_count", {"stage": "test"}) or 0
+    timer = metrics.start_request()
+    with metrics.stage("test"):
+        pass
+
+    assert REGISTRY.get_sample_value("stage_duration_seconds_count", {"stage": "test"}) == before + 1
+    assert [name for name, _ in timer.stages] == ["test"]
+
+
+def test_server_timing_header():
+    timer = StageTimer()
+    timer.add("fetch", 0.0123)
+    timer.add("rank", 0.0004)
+    assert timer.server_timing(0.02) == "fetch;dur=12.3, rank;dur=0.4, total;dur=20.0"
@@ -0,0 +1,89 @@
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from service.external import spoonacular_api
+from service.external.quota import BACKGROUND, INTERACTIVE, QuotaExhausted, QuotaLimiter
+from service.external.spoonacular_api import get_recipes_by_ingredients, search_cache, search_cache_key
+
+
+def quota_response(used, left, status=200):
+    return Mock(status_code=status, headers={"X-API-Quota-Used": str(used), "X-API-Quota-Left": str(left)})
+
+
+def test_daily_budget_is_enforced():
+    limiter = QuotaLimiter(daily_points=3, background_reserve=0)
+    limiter.acquire(cost=2)
+    with pytest.raises(QuotaExhausted) as e:
+        limiter.acquire(cost=2)
+    assert e.value.reason == "daily budget"
+    assert limiter.stats()["throttled"][INTERACTIVE] == 1
+
+
+def test_background_calls_leave_a_reserve():
+    limiter = QuotaLimiter(daily_points=10, background_reserve=0.5)
+    for _ in range(5):
+        limiter.acquire(BACKGROUND)
+    with pytest.raises(QuotaExhausted):
+        limiter.acquire(BACKGROUND)
+    limiter.acquire(INTERACTIVE)
+
+
+def test_headers_correct_the_local_count():
+    limiter = QuotaLimiter(daily_points=150)
+    limiter.update(quota_response(used=40.5, left=9.5))
+    assert limiter.left == 9.5
+
+    limiter.update(quota_response(used=50, left=0, status=402))
+    with pytest.raises(QuotaExhausted):
+        limiter.acquire()
+
+
+def test_rate_limit_waits_then_gives_up():
+    limiter = QuotaLimiter(rate=20, burst=1, max_wait=0.01)
+    limiter.acquire()
+    with pytest.raises(QuotaExhausted) as e:
+        limiter.acquire()
+    assert e.value.reason == "rate limit"
+
+    time.sleep(0.06)
+    limiter.acquire()
+
+
+def test_interactive_calls_go_first():
+    limiter = QuotaLimiter(rate=50, burst=1, max_wait=1)
+    limiter.acquire()
+    order = []
+
+    def call(priority):
+        limiter.acquire(priority)
+        order.append(priority)
+
+    background = threading.Thread(target=call, args=(BACKGROUND,))
+    interactive = threading.Thread(target=call, args=(INTERACTIVE,))
+    background.start()
+    time.sleep(0.005)
+    interactive.start()
+    background.join()
+    interactive.join()
+    assert order == [INTERACTIVE, BACKGROUND]
+
+
+@patch("service.cache.time.monotonic")
+def test_exhausted_budget_serves_stale_search_results(mock_time):
+    mock_time.return_value = 0
+    key = search_cache_key(["rice"], 5)
+    search_cache.set(key, [{"id": 1}])
+    mock_time.return_value = 10 ** 9
+
+    with patch.object(spoonacular_api.quota, "acquire", side_effect=QuotaExhausted("daily budget", 60)):
+        assert get_recipes_by_ingredients(["rice"], 5) == [{"id": 1}]
+        with pytest.raises(HTTPException) as e:
+            get_recipes_by_ingredients(["tofu"], 5)
+
+    assert e.value.status_code == 503
+    assert e.value.headers["Retry-After"] == "60"
+    assert search_cache.stats()["stale_hits"] == 1
@@ -0,0 +1,87 @@
+import random
+
+import numpy as np
+
+from logic.ingredients import get_ingredients
+from logic.scorer import rank_recipes, rank_recipes_batch
+
+
+def reference_rank(recipes, pantry_items):
+    """The original nested-loop scorer, kept here to pin the vectorized output."""
+    pantry_items = [item.lower().strip() for item in pantry_items]
+    ranked = []
+    for recipe in recipes:
+        recipe_ingredients = get_ingredients(recipe)
+        matched = sum(1 for i in recipe_ingredients if any(p in i for p in pantry_items))
+        missing = len(recipe_ingredients) - matched
+        total = len(recipe_ingredients)
+        ranked.append({
+            'recipe': recipe,
+            'matched_ingredients': matched,
+            'missing_ingredients': missing,
+            'total_ingredients': total,
+            'match_percentage': round((matched / total * 100) if total > 0 else 0, 2),
+            'score': matched - (missing * 0.5)
+        })
+    ranked.sort(key=lambda x: x['score'], reverse=True)
+    return ranked
+
+
+words = ["chicken", "rice", "olive oil", "garlic", "onion", "salt", "pepper", "egg", "flour", "milk"]
+
+
+def random_recipes(n, seed=7):
+    rng = random.Random(seed)
+    return [
+        {"id": i, "extendedIngredients": [{"name": w} for w in rng.sample(words, rng.randint(0, 6))]}
+        for i in range(n)
+    ]
+
+
+def test_rank_recipes_matches_reference():
+    recipes = random_recipes(200)
+    pantry = ["Chicken", "rice ", "oil"]
+    assert rank_recipes(recipes, pantry) == reference_rank(recipes, pantry)
+
+
+def test_top_n_is_a_prefix_of_the_full_ranking():
+    recipes = random_recipes(200)
+    pantry = ["garlic", "egg"]
+    full = reference_rank(recipes, pantry)
+    for k in (0, 1, 5, 37, 200, 500):
+        assert rank_recipes(recipes, pantry, top_n=k) == full[:k]
+
+
+def test_batch_scores_many_pantries():
+    recipes = random_recipes(50)
+    pantries = [["chicken"], ["flour", "milk", "egg"], []]
+    assert rank_recipes_batch(recipes, pantries, top_n=10) == [reference_rank(recipes, p)[:10] for p in pantries]
+
+
+def test_rank_recipes_handles_empty_input():
+    assert rank_recipes([], ["rice"]) == []
+
+
+def test_tfidf_matches_dense_cosine():
+    recipes = random_recipes(60)
+    pantry = ["chicken", "oil", "salt"]
+    vocab = sorted({w for r in recipes for w in get_ingredients(r)})
+    vectors = np.array([[w in get_ingredients(r) for w in vocab] for r in recipes], dtype=float)
+    idf = np.log((1 + len(recipes)) / (1 + vectors.sum(axis=0))) + 1
+    weighted = vectors * idf
+    query = np.array([any(p in w for p in pantry) for w in vocab]) * idf
+    norms = np.linalg.norm(weighted, axis=1) * np.linalg.norm(query)
+    expected = np.divide(weighted @ query, norms, out=np.zeros(len(recipes)), where=norms > 0)
+
+    ranked = rank_recipes(recipes, pantry, ranker="tfidf")
+    assert [e["score"] for e in ranked] == sorted(np.round(expected, 4).tolist(), reverse=True)
+    assert rank_recipes_batch(recipes, [pantry], top_n=5, ranker="tfidf") == [ranked[:5]]
+
+
+def test_tfidf_weighs_down_common_ingredients():
+    recipes = [{"id": i, "extendedIngredients": [{"name": "salt"}, {"name": n}]}
+               for i, n in enumerate(["rice", "pasta", "bread", "saffron"])]
+    recipes.append({"id": 9, "extendedIngredients": [{"name": "salt"}, {"name": "pepper"}, {"name": "oil"}]})
+    ranked = rank_recipes(recipes, ["salt", "saffron"], top_n=1, ranker="tfidf")
+    assert ranked[0]["recipe"]["id"] == 3
+    assert ranked[0]["matched_ingredients"] == 2
@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from service.main import RecommendationRequest, recommendation_key
+from service.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return ["recipe"]
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    for t in [leader] + followers:
+        t.join()
+
+    assert results == [["recipe"]] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {"leaders": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_errors_are_shared_and_not_remembered():
+    flight = SingleFlight()
+
+    def boom():
+        raise ValueError("upstream down")
+
+    with pytest.raises(ValueError):
+        flight.do("k", boom)
+    assert flight.do("k", lambda: "ok") == "ok"
+
+
+def test_recommendation_key_normalizes_request():
+    a = RecommendationRequest(ingredients=["Rice", "chicken!"], dietary=["Vegan"])
+    b = RecommendationRequest(ingredients=["chicken", "rice"], dietary=["vegan "])
+    c = RecommendationRequest(ingredients=["chicken", "rice"], top_n=10)
+    assert recommendation_key(a) == recommendation_key(b)
+    assert recommendation_key(a) != recommendation_key(c)
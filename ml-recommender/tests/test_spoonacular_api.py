@@ -36,7 +36,7 @@ fake_instructions_response = [
 
 # -------------------- Tests --------------------
 
-@patch("service.external.spoonacular_api.requests.get")
+@patch("service.external.spoonacular_api.http_client.get")
 def test_recommendations_basic(mock_get):
     # Mock the complexSearch response
     mock_resp = MagicMock()
@@ -62,7 +62,7 @@ def test_recommendations_basic(mock_get):
     assert data[0]["missing_ingredients"] == ["garlic"]
 
 
-@patch("service.external.spoonacular_api.requests.get")
+@patch("service.external.spoonacular_api.http_client.get")
 def test_recommendations_with_instructions(mock_get):
     # two consecutive calls: complexSearch and analyzedInstructions
     mock_resp_1 = MagicMock()
@@ -90,7 +90,7 @@ def test_recommendations_with_instructions(mock_get):
     assert recipe["instructions"][0]["steps"][0]["instruction"] == "Boil water."
 
 
-@patch("service.external.spoonacular_api.requests.get")
+@patch("service.external.spoonacular_api.http_client.get")
 def test_get_instructions_success(mock_get):
     mock_resp = MagicMock()
     mock_resp.json.return_value = fake_instructions_response
@@ -103,7 +103,7 @@ def test_get_instructions_success(mock_get):
     assert response.json()[0]["name"] == "Main Steps"
 
 
-@patch("service.external.spoonacular_api.requests.get")
+@patch("service.external.spoonacular_api.http_client.get")
 def test_get_instructions_not_found(mock_get):
     mock_resp = MagicMock()
     mock_resp.raise_for_status.side_effect = HTTPError("404 Client Error")
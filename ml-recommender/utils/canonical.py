@@ -0,0 +1,118 @@
+"""Canonical ingredient names.
+
+"Tomatoes", "tomato" and "Roma tomatoes, diced" should all be the same
+ingredient for matching, filtering and cache keys. `canonical_ingredient`
+cleans a name, drops preparation/size/variety modifiers, singularizes each
+word and maps synonyms onto one spelling, using the bundled tables below.
+Results are memoized, since the same few thousand strings repeat across
+requests.
+"""
+import re
+from functools import lru_cache
+
+# preparation, size and variety words that don't change what the ingredient is;
+# only dropped while another word is left ("roma tomatoes" -> "tomato", "fresh" stays "fresh")
+MODIFIERS = frozenset({
+    "fresh", "freshly", "chopped", "diced", "minced", "sliced", "grated", "shredded", "crushed", "cubed",
+    "peeled", "halved", "quartered", "trimmed", "rinsed", "drained", "thawed", "frozen", "canned",
+    "large", "small", "medium", "jumbo", "extra", "organic", "ripe", "raw", "boneless", "skinless",
+    "unsalted", "salted", "plain", "whole",
+    "roma", "heirloom", "vine", "baby", "yukon", "russet", "gold",
+})
+# modifiers that only mean nothing as a phrase: "low sodium soy sauce" is soy sauce,
+# but "low fat milk" is not "fat milk"
+MODIFIER_PHRASES = ("low sodium", "reduced sodium")
+
+# words whose trailing "s" is not a plural
+SINGULAR_S = frozenset({
+    "asparagus", "couscous", "hummus", "molasses", "swiss", "grits", "citrus", "bass", "hibiscus",
+    "lemongrass", "brussels", "anise", "oats", "chives", "greens",
+})
+IRREGULAR_PLURALS = {
+    "leaves": "leaf", "loaves": "loaf", "halves": "half", "knives": "knife", "potatoes": "potato",
+    "tomatoes": "tomato", "mangoes": "mango", "avocadoes": "avocado", "chilies": "chili", "chillies": "chili",
+    "anchovies": "anchovy", "cookies": "cookie", "pies": "pie", "cloves": "clove", "olives": "olive",
+}
+
+# whole-name synonyms, looked up after modifiers are dropped and words singularized
+SYNONYMS = {
+    "scallion": "green onion",
+    "spring onion": "green onion",
+    "garbanzo bean": "chickpea",
+    "garbanzo": "chickpea",
+    "coriander leaf": "cilantro",
+    "courgette": "zucchini",
+    "aubergine": "eggplant",
+    "capsicum": "bell pepper",
+    "rocket": "arugula",
+    "prawn": "shrimp",
+    "all purpose flour": "flour",
+    "ap flour": "flour",
+    "icing sugar": "powdered sugar",
+    "confectioner sugar": "powdered sugar",
+    "confectioners sugar": "powdered sugar",
+    "caster sugar": "sugar",
+    "granulated sugar": "sugar",
+    "white sugar": "sugar",
+    "double cream": "heavy cream",
+    "heavy whipping cream": "heavy cream",
+    "corn starch": "cornstarch",
+    "yoghurt": "yogurt",
+    "cherry tomato": "tomato",
+    "grape tomato": "tomato",
+    "plum tomato": "tomato",
+    "chile": "chili",
+    "chilli": "chili",
+    "bicarbonate of soda": "baking soda",
+    "minced meat": "ground beef",
+    "mince": "ground beef",
+    "extra virgin olive oil": "olive oil",
+    "virgin olive oil": "olive oil",
+}
+# synonyms that only hold for the whole name ("mince pie" is not "ground beef pie")
+WHOLE_NAME_ONLY = frozenset({"mince"})
+# single-word synonyms applied inside longer names ("tiger prawn" -> "tiger shrimp")
+WORD_SYNONYMS = {k: v for k, v in SYNONYMS.items() if " " not in k and k not in WHOLE_NAME_ONLY}
+
+_NON_WORD = re.compile(r"[^a-z0-9\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def clean(name: str) -> str:
+    """Lowercase, turn punctuation into spaces ("all-purpose" -> "all purpose") and collapse whitespace."""
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", name.lower())).strip()
+
+
+def singularize(word: str) -> str:
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if len(word) <= 3 or word in SINGULAR_S or not word.endswith("s") or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes", "oes")):
+        return word[:-2]
+    return word[:-1]
+
+
+@lru_cache(maxsize=65536)
+def canonical_ingredient(name: str) -> str:
+    cleaned = clean(name)
+    if cleaned in SYNONYMS:
+        return SYNONYMS[cleaned]
+
+    for phrase in MODIFIER_PHRASES:
+        stripped = f" {cleaned} ".replace(f" {phrase} ", " ").strip()
+        if stripped:
+            cleaned = stripped
+    words = cleaned.split()
+    kept = [w for w in words if w not in MODIFIERS]
+    words = [singularize(w) for w in (kept or words)]
+    canonical = " ".join(words)
+    if canonical in SYNONYMS:
+        return SYNONYMS[canonical]
+    return " ".join(WORD_SYNONYMS.get(w, w) for w in words)
+
+
+def canonical_ingredients(names):
+    return [canonical_ingredient(n) for n in names]
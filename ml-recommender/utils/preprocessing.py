@@ -1,14 +1,8 @@
-import re
 from typing import List
 
+from utils.canonical import canonical_ingredients
+
+
 def normalize_ingredients(ingredients: List[str]) -> List[str]:
-    normalized = []
-    for ingredient in ingredients:
-        # Convert to lowercase
-        ingredient = ingredient.lower()
-        # Remove special characters
-        ingredient = re.sub(r'[^a-zA-Z0-9\s]', '', ingredient)
-        # Trim whitespace
-        ingredient = ingredient.strip()
-        normalized.append(ingredient)
-    return normalized
\ No newline at end of file
+    # lowercase, strip punctuation, drop modifiers, singularize and map synonyms
+    return canonical_ingredients(ingredients)
@@ -1,11 +1,19 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify
-import requests
+from flask import Flask, render_template, request, redirect, url_for, jsonify, Response, stream_with_context, g
+import json
+import http_client
+import metrics
+import time
+from jobs import ML_API_URL, SUGGESTION_API_URL, enqueue_refresh, ml_call
+from repository import Repository, ensure_indexes, migrate_bookmarks
+from user_cache import user_cache
 from pymongo import MongoClient
 from dotenv import load_dotenv
 import os
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
 from bson.objectid import ObjectId
+from bson.errors import InvalidId
 from flask_bcrypt import Bcrypt
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
 
 load_dotenv()
 
@@ -19,12 +27,6 @@ DB_NAME = os.getenv("DB_NAME", "pantry-pal")
 client = MongoClient(MONGO_URI)
 db = client[DB_NAME]
 
-ingredients = db["ingredients"]
-users = db["users"]
-recommendations = db["recommendations"]
-
-SUGGESTION_API_URL = "http://ml-recommender:8000/recommendations"
-
 '''
 mockIngredients = [
     {"name": "Flour", "quantity": "1 lb", "notes": "half empty"},
@@ -33,6 +35,44 @@ mockIngredients = [
 ]
 '''
 
+def repo():
+    """The data-access layer for the current request."""
+    if "repo" not in g:
+        g.repo = Repository(db)
+    return g.repo
+
+request_seconds = Histogram(
+    "http_request_duration_seconds", "Time to produce a response, by route.", ["method", "route"],
+    buckets=metrics.DEFAULT_BUCKETS
+)
+requests_total = Counter(
+    "http_requests_total", "Responses by route and status code.", ["method", "route", "status"]
+)
+queries_per_request = Histogram(
+    "mongo_queries_per_request", "MongoDB queries issued by one request.", ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50)
+)
+
+@app.before_request
+def start_timing():
+    g.timer = metrics.start_request()
+    g.started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    total = time.perf_counter() - g.started
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    request_seconds.labels(request.method, route).observe(total)
+    requests_total.labels(request.method, route, str(response.status_code)).inc()
+
+    if "repo" in g:
+        stats = g.repo.stats
+        g.timer.add("db", stats.seconds)
+        queries_per_request.labels(route).observe(stats.count)
+        print(f"{request.method} {request.path}: {stats.count} queries in {stats.seconds * 1000:.1f} ms", flush=True)
+    response.headers["Server-Timing"] = g.timer.server_timing(total)
+    return response
+
 class User(UserMixin):
     def __init__(self, user_doc):
         self.id = str(user_doc["_id"])
@@ -46,27 +86,33 @@ login_manager.login_view = "login"
 
 @login_manager.user_loader
 def load_user(user_id):
-    user_doc = db.users.find_one({"_id": ObjectId(user_id)})
+    user_doc = user_cache.get(user_id)
+    if user_doc is None:
+        user_doc = repo().get_user(user_id)
+        if user_doc:
+            user_cache.set(user_id, user_doc)
+    else:
+        # later reads in this request reuse the cached document too
+        repo().remember_user(user_doc)
     return User(user_doc) if user_doc else None
 
 @app.route("/")
 @login_required
 def home():
-    user_ingredients = list(db.ingredients.find({"user_id": ObjectId(current_user.id)}))
-
-    user_doc = db.users.find_one({"_id": ObjectId(current_user.id)})
-    saved_recipe_ids = user_doc.get("bookmarked_recipes", [])
+    user_ingredients = repo().list_ingredients(current_user.id)
 
-    rec_doc = recommendations.find_one({"user_id": ObjectId(current_user.id)})
+    rec_doc = repo().get_recommendations(current_user.id)
     all_recipes = rec_doc.get("recipes", []) if rec_doc else []
 
+    saved_recipe_ids = repo().saved_recipe_ids(current_user.id, [r["id"] for r in all_recipes])
     unsaved_recipes = [r for r in all_recipes if r["id"] not in saved_recipe_ids]
 
     return render_template(
         "home.html",
         user=current_user,
         ingredients=user_ingredients,
-        recipes=unsaved_recipes
+        recipes=unsaved_recipes,
+        status=rec_doc.get("status") if rec_doc else None
     )
 
 
@@ -76,7 +122,7 @@ def login():
         username = request.form["username"]
         password = request.form["password"]
 
-        user_doc = db.users.find_one({"username": username})
+        user_doc = repo().find_user({"username": username})
 
         if not user_doc:
             error = "User not found. Create an account or try again."
@@ -88,12 +134,14 @@ def login():
 
         user = User(user_doc)
         login_user(user)
+        user_cache.set(user.id, user_doc)
         return redirect(url_for("home"))
 
     return render_template("login.html")
 
 @app.route("/logout")
 def logout():
+    user_cache.invalidate(current_user.get_id())
     logout_user()
     return redirect(url_for("login"))
 
@@ -105,7 +153,7 @@ def register():
         username = request.form["username"]
         hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
 
-        existing = db.users.find_one({"email": email})
+        existing = repo().users.find_one({"email": email}, {"_id": 1})
         if existing:
             error = "Account with this email already exists."
             return render_template("register.html", error=error)
@@ -117,8 +165,9 @@ def register():
         }
 
         # Insert once and get the inserted _id
-        result = db.users.insert_one(user_doc)
+        result = repo().users.insert_one(user_doc)
         user_doc["_id"] = result.inserted_id
+        user_cache.invalidate(result.inserted_id)
 
         user = User(user_doc)
         login_user(user)
@@ -132,28 +181,26 @@ def register():
 @login_required
 def my_recipes():
     # Get current user's ingredients
-    user_ingredients = list(db.ingredients.find({"user_id": ObjectId(current_user.id)}))
-
-    # Get existing recommendations, if any
-    user_doc = db.users.find_one({"_id": ObjectId(current_user.id)})
-    saved_recipe_ids = user_doc.get("bookmarked_recipes", [])  
-
-    rec_doc = recommendations.find_one({"user_id": ObjectId(current_user.id)})
-    all_recipes = rec_doc.get("recipes", []) if rec_doc else []
+    user_ingredients = repo().list_ingredients(current_user.id)
 
-    saved_recipes = [r for r in all_recipes if r["id"] in saved_recipe_ids]
+    # One page of saved recipes, newest first
+    try:
+        saved_recipes, next_cursor = repo().list_saved_recipes(current_user.id, after=request.args.get("after"))
+    except InvalidId:
+        return redirect(url_for("my_recipes"))
 
     return render_template(
         "my_recipes.html",
         user=current_user,
         ingredients=user_ingredients,
-        recipes=saved_recipes
+        recipes=saved_recipes,
+        next_cursor=next_cursor
     )
 
 @app.route("/my-pantry")
 @login_required
 def my_pantry():
-    user_ingredients = list(db.ingredients.find({"user_id": ObjectId(current_user.id)}))
+    user_ingredients = repo().list_ingredients(current_user.id)
     ingredient_names = [i["name"] for i in user_ingredients]
     return render_template("my_pantry.html", ingredients=user_ingredients, ingredient_names=ingredient_names)
 
@@ -166,12 +213,13 @@ def add_ingredient():
         notes = request.form["notes"]
 
         # save to db
-        db.ingredients.insert_one({
+        repo().ingredients.insert_one({
             "user_id": ObjectId(current_user.id),
             "name": name,
             "quantity": quantity,
             "notes": notes
         })
+        enqueue_refresh(repo(), ObjectId(current_user.id))
 
         return redirect(url_for("my_pantry"))
 
@@ -180,7 +228,7 @@ def add_ingredient():
 @app.route("/my-pantry/<ingredient_id>/edit", methods=["GET", "POST"])
 @login_required
 def edit_ingredient(ingredient_id):
-    ingredient = db.ingredients.find_one({
+    ingredient = repo().ingredients.find_one({
         "_id": ObjectId(ingredient_id),
         "user_id": ObjectId(current_user.id)
     })
@@ -192,7 +240,8 @@ def edit_ingredient(ingredient_id):
         quantity = request.form.get("quantity", "").strip()
         notes = request.form.get("notes", "").strip()
 
-        db.ingredients.update_one({"_id": ObjectId(ingredient_id), "user_id": ObjectId(current_user.id),}, {"$set": {"name": name, "quantity": quantity, "notes": notes,}},)
+        repo().ingredients.update_one({"_id": ObjectId(ingredient_id), "user_id": ObjectId(current_user.id),}, {"$set": {"name": name, "quantity": quantity, "notes": notes,}},)
+        enqueue_refresh(repo(), ObjectId(current_user.id))
 
         return redirect(url_for("my_pantry"))
 
@@ -201,7 +250,8 @@ def edit_ingredient(ingredient_id):
 @app.route("/my-pantry/<ingredient_id>/delete", methods=["POST"])
 @login_required
 def delete_ingredient(ingredient_id):
-    db.ingredients.delete_one({"_id": ObjectId(ingredient_id), "user_id": ObjectId(current_user.id)})
+    repo().ingredients.delete_one({"_id": ObjectId(ingredient_id), "user_id": ObjectId(current_user.id)})
+    enqueue_refresh(repo(), ObjectId(current_user.id))
     return redirect(url_for("my_pantry"))
 
 @app.route("/add-recipe")
@@ -209,76 +259,127 @@ def delete_ingredient(ingredient_id):
 def add_recipe():
     return render_template("add_recipe.html")
 
-@app.route("/recommendations", methods=["POST"])
-@login_required
-def recommend_recipes():
-    # Get current user's ingredients
-    user_ingredients = list(db.ingredients.find({"user_id": ObjectId(current_user.id)}))
-    ingredient_names = [i["name"] for i in user_ingredients]
-
+def requested_top_n():
     # Read top_n from form
     try:
-        top_n = int(request.form.get("top_n", 5))
+        return int(request.form.get("top_n", 5))
     except ValueError:
-        top_n = 5
+        return 5
 
-    payload = {
+def recommendation_payload(ingredient_names):
+    return {
         "ingredients": ingredient_names,
-        "top_n": top_n,
+        "top_n": requested_top_n(),
         "dietary": []
     }
 
-    try:
-        # Call ML service
-        response = requests.post(SUGGESTION_API_URL, json=payload)
-        response.raise_for_status()
-        recipes = response.json()
-        # print("ML Recommender response:", recipes, flush=True)
+@app.route("/recommendations", methods=["POST"])
+@login_required
+def recommend_recipes():
+    # The worker recomputes recommendations in the background; home shows the
+    # last stored result with a "refreshing" status until it is done.
+    enqueue_refresh(repo(), ObjectId(current_user.id), requested_top_n())
+    return redirect(url_for("home"))
 
-    except Exception as e:
-        print("Error calling ML Recommender:", e, flush=True)
-        recipes = []
-
-    # Save/update recipes in MongoDB
-    result = recommendations.update_one(
-        {"user_id": ObjectId(current_user.id)},
-        {"$set": {"recipes": recipes, "user_id": ObjectId(current_user.id)}},
-        upsert=True
-    )
+@app.route("/recommendations/status")
+@login_required
+def recommendation_status():
+    rec_doc = repo().get_recommendations(current_user.id, {"status": 1})
+    return jsonify({"status": rec_doc.get("status") if rec_doc else None})
 
-    # Re-render home with updated recipes
-    return render_template(
-        "home.html",
-        user=current_user,
-        ingredients=user_ingredients,
-        recipes=recipes
-    )
+@app.route("/recommendations/stream", methods=["POST"])
+@login_required
+def recommend_recipes_stream():
+    """Relay the ML service's NDJSON stream so the page can render cards before every instruction call is done."""
+    user_id = ObjectId(current_user.id)
+    user_ingredients = repo().ingredients.find({"user_id": user_id}, {"name": 1})
+    payload = recommendation_payload([i["name"] for i in user_ingredients])
+
+    def generate():
+        recipes = None
+        try:
+            response = ml_call(http_client.post, "recommendations/stream", f"{SUGGESTION_API_URL}/stream",
+                               json=payload, stream=True)
+            try:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if event["type"] == "recipes":
+                        recipes = event["recipes"]
+                    elif event["type"] == "instructions":
+                        for r in recipes or []:
+                            if r["id"] == event["id"]:
+                                r["instructions"] = event["instructions"]
+                    yield json.dumps(event) + "\n"
+            finally:
+                response.close()
+        except Exception as e:
+            print("Error streaming from ML Recommender:", e, flush=True)
+            yield json.dumps({"type": "error"}) + "\n"
+
+        if recipes is None:
+            # nothing new arrived; keep the last good result on the page, like the worker does
+            repo().recommendations.update_one({"user_id": user_id}, {"$set": {"status": "failed"}})
+            return
+
+        # Save the complete result once the stream is done
+        repo().recommendations.update_one(
+            {"user_id": user_id},
+            {"$set": {"recipes": recipes, "user_id": user_id, "status": "ready"}},
+            upsert=True
+        )
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
 
 @app.route("/recipes/<recipe_id>")
 @login_required
 def recipe_details(recipe_id):
-    rec_doc = recommendations.find_one({"user_id": ObjectId(current_user.id)})
-    if not rec_doc:
-        return redirect(url_for("home"))
+    rec_doc = repo().get_recommendations(current_user.id, {"recipes": 1})
+    recipes = rec_doc.get("recipes", []) if rec_doc else []
 
-    recipe = next((r for r in rec_doc.get("recipes", []) if str(r.get("id")) == recipe_id), None)
+    recipe = next((r for r in recipes if str(r.get("id")) == recipe_id), None)
+    if not recipe and recipe_id.isdigit():
+        # saved recipes stay viewable after recommendations are regenerated
+        recipe = repo().get_saved_recipe(current_user.id, int(recipe_id))
     if not recipe:
         return redirect(url_for("home"))
 
-    if "instructions" not in recipe or not recipe["instructions"]:
-        try:
-            resp = requests.get(f"http://ml-recommender:8000/recommendations")
-            resp.raise_for_status()
-            ml_recipes = resp.json()
-            recipe_data = next((r for r in ml_recipes if r["id"] == int(recipe_id)), {})
-            recipe["instructions"] = recipe_data.get("instructions", [])
-        except Exception as e:
-            print(f"Error fetching instructions for recipe {recipe_id}: {e}")
-            recipe["instructions"] = []
-
     return render_template("recipe_details.html", recipe=recipe)
 
 
+@app.route("/recipes/<int:recipe_id>/instructions")
+@login_required
+def recipe_instructions(recipe_id):
+    """Proxy the ML service's per-recipe instructions, passing the ETag through so the browser can revalidate."""
+    headers = {}
+    if request.headers.get("If-None-Match"):
+        headers["If-None-Match"] = request.headers["If-None-Match"]
+
+    try:
+        resp = ml_call(http_client.get, "recipe/instructions", f"{ML_API_URL}/recipe/{recipe_id}/instructions",
+                       headers=headers)
+    except Exception as e:
+        print(f"Error fetching instructions for recipe {recipe_id}: {e}", flush=True)
+        return jsonify([]), 502
+
+    if resp.status_code in (404, 503):
+        # a throttled ML service says when to come back; pass that on
+        retry_after = resp.headers.get("Retry-After")
+        return jsonify([]), resp.status_code, {"Retry-After": retry_after} if retry_after else {}
+    if resp.status_code not in (200, 304):
+        return jsonify([]), 502
+
+    response = Response(resp.content if resp.status_code == 200 else b"", status=resp.status_code,
+                        mimetype="application/json")
+    if resp.headers.get("ETag"):
+        response.headers["ETag"] = resp.headers["ETag"]
+    # the page is per-user, so only the browser may keep a copy
+    response.headers["Cache-Control"] = resp.headers.get("Cache-Control", "no-cache").replace("public", "private")
+    return response
+
+
 @app.route('/recipes/<recipe_id>/bookmarked', methods=["POST"])
 @login_required
 def bookmark_recipe(recipe_id):
@@ -287,7 +388,7 @@ def bookmark_recipe(recipe_id):
     except ValueError:
         return "Invalid recipe ID", 400
 
-    rec_doc = recommendations.find_one({"user_id": ObjectId(current_user.id)})
+    rec_doc = repo().get_recommendations(current_user.id, {"recipes": 1})
     if not rec_doc:
         return "No recommendations found for user", 404
 
@@ -295,14 +396,26 @@ def bookmark_recipe(recipe_id):
     if not recipe:
         return "Recipe not found", 404
     
-    db.users.update_one(
-        {"_id": ObjectId(current_user.id)},
-        {"$addToSet": {"bookmarked_recipes": recipe["id"]}}
-    )
+    repo().save_recipe(current_user.id, recipe)
 
     return "", 200
 
-    
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
+
+@app.route("/cache/stats")
+def cache_stats():
+    return jsonify({"users": user_cache.stats()})
+
+
+@app.route("/http/stats")
+def http_stats():
+    return jsonify(http_client.connection_stats())
+
 
 if __name__ == "__main__":
+    ensure_indexes(db)
+    migrate_bookmarks(db)
     app.run(host="0.0.0.0", port=5001)
@@ -0,0 +1,89 @@
+"""Pooled HTTP client shared by every outbound call.
+
+One keep-alive session per process so repeated calls to the same host reuse
+TCP/TLS connections instead of paying a handshake each time. Every request gets
+a connect/read timeout and idempotent requests are retried with jittered,
+capped exponential backoff on connection errors and 5xx responses. 429s are
+not retried here: Retry-After can ask for minutes, and throttling belongs to
+the caller (for Spoonacular, the quota limiter in external/quota.py).
+
+The ML service keeps an identical copy of this module
+(ml-recommender/service/http_client.py) since each service is built from its
+own Docker context.
+"""
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.3"))
+BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER", "0.3"))
+# longest single sleep between retries, so a retry never holds a request thread for long
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "2"))
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class PooledSession(requests.Session):
+    """requests.Session with sized keep-alive pools, default timeouts and a retry policy."""
+
+    def __init__(self, pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), max_retries: int = MAX_RETRIES):
+        super().__init__()
+        self.timeout = timeout
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=BACKOFF_FACTOR,
+            backoff_jitter=BACKOFF_JITTER,
+            backoff_max=BACKOFF_MAX,
+            status_forcelist=RETRY_STATUSES,
+            # a 503's Retry-After is unbounded too; the capped backoff decides the wait
+            respect_retry_after_header=False,
+            # hand the last response back so callers still see the real status code
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().request(method, url, **kwargs)
+
+    def connection_stats(self):
+        """Per-host counts of opened connections vs. requests sent over them."""
+        stats = {}
+        for adapter in {id(a): a for a in self.adapters.values()}.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = f"{key.key_scheme}://{pool.host}:{pool.port}"
+                stats[host] = {
+                    "connections": pool.num_connections,
+                    "requests": pool.num_requests,
+                    "reused": max(pool.num_requests - pool.num_connections, 0)
+                }
+        return stats
+
+
+session = PooledSession()
+
+
+def get(url, **kwargs):
+    return session.get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return session.post(url, **kwargs)
+
+
+def connection_stats():
+    return session.connection_stats()
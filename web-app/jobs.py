@@ -0,0 +1,105 @@
+"""Background recommendation refreshes.
+
+Pantry changes enqueue a refresh job in the `recommendation_jobs` collection
+instead of calling the ML service inside the Flask request. `worker.py` claims
+jobs, recomputes the user's recommendations and stores them in the
+`recommendations` document, whose `status` the pages show meanwhile.
+"""
+import os
+from datetime import datetime, timedelta
+
+from prometheus_client import Counter
+from pymongo import ReturnDocument
+
+import http_client
+import metrics
+
+ML_API_URL = os.getenv("ML_API_URL", "http://ml-recommender:8000")
+SUGGESTION_API_URL = os.getenv("SUGGESTION_API_URL", f"{ML_API_URL}/recommendations")
+DEFAULT_TOP_N = 5
+# a job left running this long is assumed to belong to a dead worker and is retried
+JOB_TIMEOUT = timedelta(seconds=int(os.getenv("RECOMMENDATION_JOB_TIMEOUT", "300")))
+
+ml_requests = Counter(
+    "ml_requests_total", "Calls to the ML service by endpoint and outcome.", ["endpoint", "outcome"]
+)
+
+
+def ml_call(send, endpoint, url, **kwargs):
+    """Call the ML service with `send` (http_client.get/post), timed as the "ml" stage and counted by outcome."""
+    outcome = "error"
+    try:
+        with metrics.stage("ml"):
+            response = send(url, **kwargs)
+        outcome = f"{response.status_code // 100}xx"
+        return response
+    finally:
+        ml_requests.labels(endpoint, outcome).inc()
+
+
+def enqueue_refresh(db, user_id, top_n=DEFAULT_TOP_N):
+    """Queue a refresh for the user; repeated pantry edits collapse into one queued job."""
+    now = datetime.utcnow()
+    db.recommendation_jobs.update_one(
+        {"user_id": user_id, "status": "queued"},
+        {"$set": {"top_n": top_n}, "$setOnInsert": {"user_id": user_id, "status": "queued", "queued_at": now}},
+        upsert=True
+    )
+    db.recommendations.update_one(
+        {"user_id": user_id},
+        {"$set": {"user_id": user_id, "status": "refreshing"}},
+        upsert=True
+    )
+
+
+def claim_job(db):
+    """Atomically take the oldest queued (or abandoned) job, or None."""
+    now = datetime.utcnow()
+    return db.recommendation_jobs.find_one_and_update(
+        {"$or": [
+            {"status": "queued"},
+            {"status": "running", "started_at": {"$lt": now - JOB_TIMEOUT}},
+        ]},
+        {"$set": {"status": "running", "started_at": now}},
+        sort=[("queued_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def refresh_recommendations(db, user_id, top_n=DEFAULT_TOP_N):
+    """Recompute a user's recommendations from their current pantry and store them."""
+    user_ingredients = db.ingredients.find({"user_id": user_id}, {"name": 1})
+    payload = {
+        "ingredients": [i["name"] for i in user_ingredients],
+        "top_n": top_n,
+        "dietary": [],
+        # the details page loads instructions per recipe, so stored results stay small
+        "include_instructions": False
+    }
+
+    try:
+        response = ml_call(http_client.post, "recommendations", SUGGESTION_API_URL, json=payload)
+        response.raise_for_status()
+        recipes = response.json()
+    except Exception as e:
+        print(f"Error refreshing recommendations for user {user_id}: {e}", flush=True)
+        # keep the last good result on the page
+        db.recommendations.update_one({"user_id": user_id}, {"$set": {"status": "failed"}})
+        return False
+
+    db.recommendations.update_one(
+        {"user_id": user_id},
+        {"$set": {
+            "recipes": recipes,
+            "user_id": user_id,
+            "status": "ready",
+            "refreshed_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+    return True
+
+
+def run_job(db, job):
+    refresh_recommendations(db, job["user_id"], job.get("top_n", DEFAULT_TOP_N))
+    db.recommendation_jobs.delete_one({"_id": job["_id"]})
@@ -0,0 +1,170 @@
+"""Request-scoped data access for the web-app.
+
+A Repository lives for one Flask request (see `repo()` in app.py). It keeps an
+identity map so the user document is loaded at most once per request, reads
+with field projections, and counts and times every query so per-request query
+growth shows up in the logs.
+"""
+import time
+
+from bson.objectid import ObjectId
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+
+USER_FIELDS = {"email": 1, "password": 1, "username": 1}
+INGREDIENT_FIELDS = {"name": 1, "quantity": 1, "notes": 1}
+RECOMMENDATION_FIELDS = {"recipes": 1, "status": 1}
+# what a saved recipe keeps from the recommendation it was bookmarked from
+RECIPE_SUMMARY_FIELDS = ("id", "name", "image", "matched_ingredients", "missing_ingredients", "dietary_tags")
+SAVED_PAGE_SIZE = 12
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+class CountingCollection:
+    """Wraps a collection so every call is counted and timed. `find` results are materialized inside the timer."""
+
+    def __init__(self, collection, stats):
+        self._collection = collection
+        self._stats = stats
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+                return list(result) if name == "find" else result
+            finally:
+                self._stats.count += 1
+                self._stats.seconds += time.perf_counter() - start
+
+        return timed
+
+
+class Repository:
+    def __init__(self, db):
+        self._db = db
+        self.stats = QueryStats()
+        self._collections = {}
+        self._users = {}
+
+    def __getattr__(self, name):
+        # any collection name, e.g. repo.ingredients or repo.recommendation_jobs
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name not in self._collections:
+            self._collections[name] = CountingCollection(getattr(self._db, name), self.stats)
+        return self._collections[name]
+
+    def get_user(self, user_id):
+        """The user document, loaded at most once per request."""
+        key = str(user_id)
+        if key not in self._users:
+            self._users[key] = self.users.find_one({"_id": ObjectId(user_id)}, USER_FIELDS)
+        return self._users[key]
+
+    def remember_user(self, user_doc):
+        self._users[str(user_doc["_id"])] = user_doc
+
+    def find_user(self, query):
+        user_doc = self.users.find_one(query, USER_FIELDS)
+        if user_doc:
+            self.remember_user(user_doc)
+        return user_doc
+
+    def list_ingredients(self, user_id):
+        return self.ingredients.find({"user_id": ObjectId(user_id)}, INGREDIENT_FIELDS)
+
+    def get_recommendations(self, user_id, fields=RECOMMENDATION_FIELDS):
+        return self.recommendations.find_one({"user_id": ObjectId(user_id)}, fields)
+
+    def save_recipe(self, user_id, recipe):
+        """Bookmark a recipe with a snapshot of its summary, so it survives new recommendations."""
+        _upsert_saved_recipe(self.saved_recipes, ObjectId(user_id), recipe)
+
+    def saved_recipe_ids(self, user_id, recipe_ids):
+        """Which of `recipe_ids` the user has saved; costs one indexed lookup however many they've saved."""
+        if not recipe_ids:
+            return set()
+        docs = self.saved_recipes.find(
+            {"user_id": ObjectId(user_id), "recipe_id": {"$in": list(recipe_ids)}},
+            {"recipe_id": 1, "_id": 0}
+        )
+        return {d["recipe_id"] for d in docs}
+
+    def get_saved_recipe(self, user_id, recipe_id):
+        doc = self.saved_recipes.find_one({"user_id": ObjectId(user_id), "recipe_id": recipe_id}, {"recipe": 1})
+        return doc["recipe"] if doc else None
+
+    def list_saved_recipes(self, user_id, after=None, limit=SAVED_PAGE_SIZE):
+        """One page of saved recipes, newest first, and the cursor for the next page (or None)."""
+        query = {"user_id": ObjectId(user_id)}
+        if after:
+            query["_id"] = {"$lt": ObjectId(after)}
+        docs = self.saved_recipes.find(query, {"recipe": 1}, sort=[("_id", DESCENDING)], limit=limit + 1)
+        next_cursor = str(docs[limit - 1]["_id"]) if len(docs) > limit else None
+        return [d["recipe"] for d in docs[:limit]], next_cursor
+
+
+def _upsert_saved_recipe(saved_recipes, user_id, recipe):
+    saved_recipes.update_one(
+        {"user_id": user_id, "recipe_id": recipe["id"]},
+        {"$setOnInsert": {
+            "user_id": user_id,
+            "recipe_id": recipe["id"],
+            "recipe": {k: recipe.get(k) for k in RECIPE_SUMMARY_FIELDS},
+            "saved_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+
+
+def migrate_bookmarks(db):
+    """Move bookmarks from the old `users.bookmarked_recipes` array into `saved_recipes`.
+
+    Summaries come from the user's current recommendations where the recipe is
+    still there, otherwise only the id is kept (the details page loads the
+    rest). Upserts make it safe to rerun, and the old field is removed once a
+    user's bookmarks are copied, so it runs on every start at no cost.
+    """
+    migrated = 0
+    for user in db.users.find({"bookmarked_recipes": {"$exists": True}}, {"bookmarked_recipes": 1}):
+        rec_doc = db.recommendations.find_one({"user_id": user["_id"]}, {"recipes": 1}) or {}
+        summaries = {r.get("id"): r for r in rec_doc.get("recipes") or []}
+        for recipe_id in user.get("bookmarked_recipes") or []:
+            recipe = summaries.get(recipe_id) or {"id": recipe_id, "name": f"Recipe {recipe_id}"}
+            _upsert_saved_recipe(db.saved_recipes, user["_id"], recipe)
+        db.users.update_one({"_id": user["_id"]}, {"$unset": {"bookmarked_recipes": ""}})
+        migrated += 1
+    if migrated:
+        print(f"Migrated bookmarks of {migrated} users to saved_recipes", flush=True)
+    return migrated
+
+
+def ensure_indexes(db):
+    """Create the indexes the web-app's queries rely on. Safe to run on every start."""
+    indexes = [
+        ("ingredients", [("user_id", ASCENDING)], {}),
+        ("users", [("username", ASCENDING)], {}),
+        ("users", [("email", ASCENDING)], {"unique": True}),
+        ("saved_recipes", [("user_id", ASCENDING), ("recipe_id", ASCENDING)], {"unique": True}),
+        ("saved_recipes", [("user_id", ASCENDING), ("_id", DESCENDING)], {}),
+        ("recommendations", [("user_id", ASCENDING)], {"unique": True}),
+        ("recommendation_jobs", [("status", ASCENDING), ("queued_at", ASCENDING)], {}),
+        ("recommendation_jobs", [("user_id", ASCENDING), ("status", ASCENDING)], {}),
+    ]
+    for collection, keys, options in indexes:
+        try:
+            db[collection].create_index(keys, **options)
+        except PyMongoError as e:
+            print(f"Could not create index {keys} on {collection}: {e}", flush=True)
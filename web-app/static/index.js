@@ -1,30 +1,158 @@
+const BOOKMARK_ICON = `
+    <svg xmlns="http://www.w3.org/2000/svg" width="25" height="25" viewBox="-1 0 18 18">
+        <path fill="#bfe899"
+            d="M2 2v13.5a.5.5 0 0 0 .74.439L8 13.069l5.26 2.87A.5.5 0 0 0 14 15.5V2a2 2 0 0 0-2-2H4a2 2 0 0 0-2 2"
+        />
+    </svg>`;
+
+function truncate(text, length) {
+    return text.length > length ? text.slice(0, length - 3) + '...' : text;
+}
+
+function infoLine(tag, values) {
+    const p = document.createElement('p');
+    const span = document.createElement('span');
+    span.className = 'recipe-info-tag';
+    span.textContent = tag + ':';
+    p.append(span, ' ' + (values && values.length ? truncate(values.join(', '), 60) : 'None'));
+    return p;
+}
+
+// Same markup as the recipe cards rendered by home.html
+function renderRecipeCard(recipe, logoUrl) {
+    const link = document.createElement('a');
+    link.href = `/recipes/${recipe.id}`;
+    link.className = 'recipe-card-link';
+    link.dataset.recipeId = recipe.id;
+
+    const card = document.createElement('div');
+    card.className = 'recipe-card loading-instructions';
+
+    const img = document.createElement('img');
+    img.src = recipe.image || logoUrl;
+    img.alt = recipe.image ? recipe.name : 'logo';
+    if (!recipe.image) img.id = 'logo-recipe-card';
+
+    const info = document.createElement('div');
+    info.className = 'recipe-info';
+
+    const title = document.createElement('div');
+    title.className = 'recipe-card-title';
+    const h3 = document.createElement('h3');
+    h3.textContent = truncate(recipe.name || '', 35);
+    const actions = document.createElement('div');
+    actions.className = 'recipe-actions';
+    const bookmark = document.createElement('div');
+    bookmark.className = 'recipe-bookmark';
+    bookmark.dataset.id = recipe.id;
+    bookmark.innerHTML = BOOKMARK_ICON;
+    actions.append(bookmark);
+    title.append(h3, actions);
+
+    const details = document.createElement('div');
+    details.append(
+        infoLine('Matched', Array.isArray(recipe.matched_ingredients) ? recipe.matched_ingredients : [String(recipe.matched_ingredients)]),
+        infoLine('Missing', recipe.missing_ingredients),
+        infoLine('Dietary Tags', recipe.dietary_tags)
+    );
+
+    info.append(title, details);
+    card.append(img, info);
+    link.append(card);
+    return link;
+}
+
+async function streamRecommendations(form) {
+    const grid = document.getElementById('recipe-grid');
+    const res = await fetch(form.dataset.streamUrl, { method: 'POST', body: new FormData(form) });
+    if (!res.ok || !res.body) throw new Error(`stream failed: ${res.status}`);
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    const handle = (event) => {
+        if (event.type === 'recipes') {
+            grid.replaceChildren(...event.recipes.map(r => renderRecipeCard(r, grid.dataset.logo)));
+        } else if (event.type === 'instructions') {
+            const card = grid.querySelector(`[data-recipe-id="${event.id}"] .recipe-card`);
+            if (card) card.classList.remove('loading-instructions');
+        } else if (event.type === 'error') {
+            throw new Error('recommender error');
+        }
+    };
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => handle(JSON.parse(line)));
+    }
+    if (buffer.trim()) handle(JSON.parse(buffer));
+}
+
+// Reload once the background refresh has stored new recommendations
+function pollRecommendationStatus(el) {
+    const timer = setInterval(async () => {
+        try {
+            const res = await fetch(el.dataset.statusUrl);
+            const { status } = await res.json();
+            if (status !== 'refreshing') {
+                clearInterval(timer);
+                window.location.reload();
+            }
+        } catch (err) {
+            console.error(err);
+        }
+    }, 2000);
+}
+
 document.addEventListener("DOMContentLoaded", () => {
-    const bookMarkBtns = document.querySelectorAll('.recipe-bookmark');
+    const statusEl = document.getElementById('recommendation-status');
+    if (statusEl) pollRecommendationStatus(statusEl);
 
-    bookMarkBtns.forEach(btn => {
-        btn.addEventListener('click', async (e) => {
+    const form = document.getElementById('recommend-form');
+    if (form && window.ReadableStream) {
+        form.addEventListener('submit', async (e) => {
             e.preventDefault();
-
-           const recipeId = btn.dataset.id;
-            
-            try { 
-                console.log('clicked! ');
-                const res = await fetch(`/recipes/${recipeId}/bookmarked`, {
-                    method: 'POST'
-                });
-
-                console.log("2")
-                if(res.ok) { 
-                    btn.classList.toggle('active');  
-                    btn.querySelector("svg path").style.fill = "rgb(223, 188, 30)";
-                } else { 
-                    alert("Error adding recipe to bookmarked recipes 1");
-                }
-            } catch (err) { 
-                console.log('3')
+            const button = form.querySelector('button');
+            button.disabled = true;
+            try {
+                await streamRecommendations(form);
+            } catch (err) {
                 console.error(err);
-                alert("Error adding recipe to bookmarked recipes 2")
+                // fall back to the regular full-page request
+                form.submit();
+            } finally {
+                button.disabled = false;
             }
         });
+    }
+
+    // delegated so cards rendered from the stream get the handler too
+    document.addEventListener('click', async (e) => {
+        const btn = e.target.closest('.recipe-bookmark');
+        if (!btn) return;
+        e.preventDefault();
+
+        const recipeId = btn.dataset.id;
+
+        try {
+            const res = await fetch(`/recipes/${recipeId}/bookmarked`, {
+                method: 'POST'
+            });
+
+            if(res.ok) {
+                btn.classList.toggle('active');
+                btn.querySelector("svg path").style.fill = "rgb(223, 188, 30)";
+            } else {
+                alert("Error adding recipe to bookmarked recipes 1");
+            }
+        } catch (err) {
+            console.error(err);
+            alert("Error adding recipe to bookmarked recipes 2")
+        }
     });
- });
\ No newline at end of file
+ });
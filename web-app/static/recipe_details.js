@@ -0,0 +1,47 @@
+// Same markup as the instruction sections rendered by recipe_details.html
+function renderInstructions(container, sections) {
+    container.replaceChildren();
+    if (!sections.length) {
+        const p = document.createElement('p');
+        p.textContent = 'No instructions available.';
+        container.append(p);
+        return;
+    }
+
+    for (const section of sections) {
+        const heading = document.createElement('h3');
+        heading.textContent = section.name;
+
+        const list = document.createElement('ol');
+        for (const step of section.steps) {
+            const li = document.createElement('li');
+            li.append(step.instruction);
+            if (step.equipment && step.equipment.length) {
+                const em = document.createElement('em');
+                em.textContent = 'Equipment: ' + step.equipment.join(', ');
+                li.append(document.createElement('br'), em);
+            }
+            if (step.time) {
+                const em = document.createElement('em');
+                em.textContent = `Time: ${step.time.number} ${step.time.unit}`;
+                li.append(document.createElement('br'), em);
+            }
+            list.append(li);
+        }
+        container.append(heading, list);
+    }
+}
+
+// Instructions are fetched after the page renders; the browser revalidates them with the ETag
+document.addEventListener("DOMContentLoaded", async () => {
+    const container = document.getElementById('recipe-instructions');
+    if (!container) return;
+
+    try {
+        const res = await fetch(container.dataset.url);
+        renderInstructions(container, res.ok ? await res.json() : []);
+    } catch (err) {
+        console.error(err);
+        renderInstructions(container, []);
+    }
+});
@@ -6,7 +6,7 @@ import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from app import app, bcrypt, User
-import requests
+import http_client
 
 @pytest.fixture
 def _test_client():
@@ -38,13 +38,12 @@ def mock_requests_post(monkeypatch):
                 pass
         return MockResponse()
     
-    monkeypatch.setattr(requests, "post", _mock_post)
+    monkeypatch.setattr(http_client, "post", _mock_post)
     return _mock_post
 
 
-@patch("app.recommendations")
 @patch("app.db")
-def test_login_success(mock_db, mock_recommendations, _test_client):
+def test_login_success(mock_db, _test_client):
     mock_user_id = ObjectId()
     hashed_pw = bcrypt.generate_password_hash("password123").decode("utf-8")
 
@@ -56,7 +55,7 @@ def test_login_success(mock_db, mock_recommendations, _test_client):
     }
 
     # Mock recommendations so home() doesn't hit MongoDB
-    mock_recommendations.find_one.return_value = None
+    mock_db.recommendations.find_one.return_value = None
     mock_db.ingredients.find.return_value = []
 
     response = _test_client.post(
@@ -222,40 +221,264 @@ def test_delete_ingredient_deletes_and_redirects(mock_db, _test_client, test_use
     assert filt["_id"] == ingredient_id
 
 
-@patch("app.recommendations")
-@patch("app.requests.post")
 @patch("app.db")
-def test_recommend_recipes(mock_db, mock_requests_post, mock_recommendations, _test_client, test_user): 
-    """POST /home/recommendations should return recipes correct recipes."""
-    ingredient_id = ObjectId()
+def test_recommend_recipes(mock_db, _test_client, test_user):
+    """POST /recommendations should queue a background refresh instead of calling the ML API."""
+    res = _test_client.post("/recommendations", data={"top_n": 5}, follow_redirects=False)
+
+    assert res.status_code == 302
+    assert res.headers["Location"].endswith("/")
+
+    mock_db.recommendation_jobs.update_one.assert_called_once()
+    filt, update = mock_db.recommendation_jobs.update_one.call_args[0]
+    assert filt == {"user_id": ObjectId(test_user.id), "status": "queued"}
+    assert update["$set"]["top_n"] == 5
+    mock_db.recommendations.update_one.assert_called_once()
+    assert mock_db.recommendations.update_one.call_args[0][1]["$set"]["status"] == "refreshing"
+
+
+@patch("app.db")
+def test_pantry_changes_queue_refresh(mock_db, _test_client, test_user):
+    """Adding or deleting an ingredient should queue a recommendation refresh."""
+    _test_client.post("/my-pantry/add", data={"name": "lettuce", "quantity": "3", "notes": ""})
+    _test_client.post(f"/my-pantry/{ObjectId()}/delete")
+
+    assert mock_db.recommendation_jobs.update_one.call_count == 2
+
+
+@patch("app.db")
+def test_home_shows_refreshing_status(mock_db, _test_client, test_user):
+    """Home should render the last stored recipes while a refresh is running."""
+    mock_db.ingredients.find.return_value = []
+    mock_db.users.find_one.return_value = {"_id": ObjectId(test_user.id), "bookmarked_recipes": []}
+    mock_db.recommendations.find_one.return_value = {
+        "recipes": [{"id": 1, "name": "Turbo Chicken"}],
+        "status": "refreshing"
+    }
+    test_user.username = "tester"
+
+    res = _test_client.get("/")
+
+    assert res.status_code == 200
+    assert b"Turbo Chicken" in res.data
+    assert b"Refreshing your recommendations" in res.data
+
 
-    mock_db.ingredients.find.return_value = [
-        {"_id": ingredient_id, "user_id": ObjectId(test_user.id), "name": "olive oil", "quantity": "1", "notes": "",},
-        {"_id": ingredient_id, "user_id": ObjectId(test_user.id), "name": "chicken", "quantity": "1lb", "notes": "",}
+@patch("app.http_client.post")
+@patch("app.db")
+def test_recommend_recipes_stream_relays_and_saves(mock_db, mock_post, _test_client, test_user):
+    """POST /recommendations/stream should pass recipe lines through as they arrive and save the result."""
+    mock_db.ingredients.find.return_value = [{"_id": ObjectId(), "user_id": ObjectId(test_user.id), "name": "rice"}]
+    mock_post.return_value.iter_lines.return_value = [
+        b'{"type": "recipes", "recipes": [{"id": 1, "name": "Fried Rice"}]}',
+        b'',
+        b'{"type": "instructions", "id": 1, "instructions": [{"name": "Main", "steps": []}]}',
     ]
 
-    # Fake ML response 
-    fake_recipes = [
-        {"name": "Turbo Chicken", "image": "https://img.spoonacular.com/recipes/663971-312x231.jpg"},
-        {"name": "Crispy Buttermilk Fried Chicken", "image": "https://img.spoonacular.com/recipes/640803-312x231.jpg"}
+    res = _test_client.post("/recommendations/stream", data={"top_n": 3})
+
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+    lines = res.get_data(as_text=True).splitlines()
+    assert len(lines) == 2
+    assert "Fried Rice" in lines[0]
+
+    assert mock_post.call_args[0][0].endswith("/recommendations/stream")
+    assert mock_post.call_args[1]["json"]["top_n"] == 3
+    saved = mock_db.recommendations.update_one.call_args[0][1]["$set"]["recipes"]
+    assert saved == [{"id": 1, "name": "Fried Rice", "instructions": [{"name": "Main", "steps": []}]}]
+
+
+@patch("app.http_client.post")
+@patch("app.db")
+def test_recommend_recipes_stream_failure_keeps_last_result(mock_db, mock_post, _test_client, test_user):
+    """A failed ML call should mark the refresh failed, not overwrite stored recipes with an empty list."""
+    import requests
+    mock_db.ingredients.find.return_value = [{"_id": ObjectId(), "user_id": ObjectId(test_user.id), "name": "rice"}]
+    mock_post.return_value.raise_for_status.side_effect = requests.HTTPError("500 Server Error")
+
+    res = _test_client.post("/recommendations/stream", data={"top_n": 3})
+
+    assert '"error"' in res.get_data(as_text=True)
+    mock_db.recommendations.update_one.assert_called_once_with(
+        {"user_id": ObjectId(test_user.id)}, {"$set": {"status": "failed"}}
+    )
+
+
+@patch("app.db")
+def test_home_loads_user_once_with_projections(mock_db, _test_client, test_user):
+    """home() should reuse the user document within a request and project only needed fields."""
+    from repository import INGREDIENT_FIELDS, USER_FIELDS
+
+    mock_db.ingredients.find.return_value = []
+    mock_db.users.find_one.return_value = {"_id": ObjectId(test_user.id), "bookmarked_recipes": []}
+    mock_db.recommendations.find_one.return_value = None
+    test_user.username = "tester"
+
+    with app.test_request_context("/"):
+        from app import home, repo
+        repo().get_user(test_user.id)
+        home()
+        assert repo().stats.count == 3
+
+    mock_db.users.find_one.assert_called_once_with({"_id": ObjectId(test_user.id)}, USER_FIELDS)
+    mock_db.ingredients.find.assert_called_once_with({"user_id": ObjectId(test_user.id)}, INGREDIENT_FIELDS)
+
+
+def test_ensure_indexes_declares_lookup_indexes():
+    """Startup should index every field the web-app queries by."""
+    from unittest.mock import MagicMock
+    from repository import ensure_indexes
+
+    db = {name: MagicMock() for name in ("ingredients", "users", "saved_recipes", "recommendations", "recommendation_jobs")}
+    ensure_indexes(db)
+
+    db["ingredients"].create_index.assert_any_call([("user_id", 1)])
+    db["users"].create_index.assert_any_call([("username", 1)])
+    db["users"].create_index.assert_any_call([("email", 1)], unique=True)
+    db["recommendations"].create_index.assert_any_call([("user_id", 1)], unique=True)
+    db["saved_recipes"].create_index.assert_any_call([("user_id", 1), ("recipe_id", 1)], unique=True)
+
+
+def test_migrate_bookmarks_copies_and_unsets_old_array():
+    """Old users.bookmarked_recipes entries move to saved_recipes, with summaries from recommendations."""
+    from unittest.mock import MagicMock
+    from repository import migrate_bookmarks
+
+    user_id = ObjectId()
+    db = MagicMock()
+    db.users.find.return_value = [{"_id": user_id, "bookmarked_recipes": [1, 2]}]
+    db.recommendations.find_one.return_value = {"recipes": [{"id": 1, "name": "Rice Bowl", "image": "img"}]}
+
+    assert migrate_bookmarks(db) == 1
+
+    saved = {c.args[0]["recipe_id"]: c.args[1]["$setOnInsert"]["recipe"] for c in db.saved_recipes.update_one.call_args_list}
+    assert saved[1]["name"] == "Rice Bowl" and saved[1]["image"] == "img"
+    assert saved[2]["id"] == 2
+    assert all(c.kwargs["upsert"] for c in db.saved_recipes.update_one.call_args_list)
+    db.users.update_one.assert_called_once_with({"_id": user_id}, {"$unset": {"bookmarked_recipes": ""}})
+
+
+@patch("app.db")
+def test_load_user_is_cached_until_invalidated(mock_db):
+    """load_user should hit MongoDB once per user until the cache entry is invalidated."""
+    from app import load_user
+    from user_cache import user_cache
+
+    user_id = ObjectId()
+    mock_db.users.find_one.return_value = {
+        "_id": user_id, "username": "cached", "email": "c@example.com", "password": "x"
+    }
+    user_cache.clear()
+
+    with app.test_request_context("/"):
+        assert load_user(str(user_id)).username == "cached"
+    with app.test_request_context("/"):
+        assert load_user(str(user_id)).username == "cached"
+    assert mock_db.users.find_one.call_count == 1
+    assert user_cache.stats()["hits"] == 1
+
+    user_cache.invalidate(str(user_id))
+    with app.test_request_context("/"):
+        load_user(str(user_id))
+    assert mock_db.users.find_one.call_count == 2
+
+
+@patch("app.db")
+def test_bookmark_saves_recipe_snapshot(mock_db, _test_client, test_user):
+    """Bookmarking should upsert a summary snapshot into saved_recipes."""
+    mock_db.recommendations.find_one.return_value = {"recipes": [
+        {"id": 42, "name": "Turbo Chicken", "image": "img.jpg", "instructions": [{"name": "Main"}]}
+    ]}
+
+    res = _test_client.post("/recipes/42/bookmarked")
+
+    assert res.status_code == 200
+    filt, update = mock_db.saved_recipes.update_one.call_args[0]
+    assert filt == {"user_id": ObjectId(test_user.id), "recipe_id": 42}
+    snapshot = update["$setOnInsert"]["recipe"]
+    assert snapshot["name"] == "Turbo Chicken"
+    assert "instructions" not in snapshot
+    assert mock_db.saved_recipes.update_one.call_args[1]["upsert"] is True
+
+
+@patch("app.db")
+def test_my_recipes_paginates_by_cursor(mock_db, _test_client, test_user):
+    """my_recipes should show one page and link to the next using the last _id as cursor."""
+    from repository import SAVED_PAGE_SIZE
+
+    ids = [ObjectId() for _ in range(SAVED_PAGE_SIZE + 1)]
+    mock_db.ingredients.find.return_value = []
+    mock_db.saved_recipes.find.return_value = [
+        {"_id": i, "recipe": {"id": n, "name": f"Saved {n}"}} for n, i in enumerate(ids)
     ]
+    test_user.username = "tester"
 
-    # Mock requests.post call
-    mock_res = mock_requests_post.return_value
-    mock_res.json.return_value = fake_recipes 
-    mock_res.raise_for_status.return_value = None
-    res = _test_client.post("/recommendations", data={"top_n": 5})
+    after = ObjectId()
+    res = _test_client.get(f"/my-recipes?after={after}")
 
     assert res.status_code == 200
+    assert b"Saved 0" in res.data
+    assert f"Saved {SAVED_PAGE_SIZE}".encode() not in res.data
+    assert f"after={ids[SAVED_PAGE_SIZE - 1]}".encode() in res.data
+    query = mock_db.saved_recipes.find.call_args[0][0]
+    assert query == {"user_id": ObjectId(test_user.id), "_id": {"$lt": after}}
 
-    mock_db.ingredients.find.assert_called_once_with({"user_id": ObjectId(test_user.id)})
 
-    # Assert ML API called correctly
-    mock_requests_post.assert_called_once()
-    sent = mock_requests_post.call_args[1]["json"]
-    assert sent["ingredients"] == ["olive oil", "chicken"]
-    assert sent["top_n"] == 5
+@patch("app.db")
+def test_home_hides_saved_recipes(mock_db, _test_client, test_user):
+    """home() should only look up saved state for the recommended ids."""
+    mock_db.ingredients.find.return_value = []
+    mock_db.recommendations.find_one.return_value = {"recipes": [
+        {"id": 1, "name": "Saved Soup"}, {"id": 2, "name": "Fresh Salad"}
+    ]}
+    mock_db.saved_recipes.find.return_value = [{"recipe_id": 1}]
+    test_user.username = "tester"
 
-    mock_recommendations.update_one.assert_called_once()
-    assert b"Turbo Chicken" in res.data
-    assert b"Crispy Buttermilk Fried Chicken" in res.data
+    res = _test_client.get("/")
+
+    assert b"Fresh Salad" in res.data
+    assert b"Saved Soup" not in res.data
+    query = mock_db.saved_recipes.find.call_args[0][0]
+    assert query["recipe_id"] == {"$in": [1, 2]}
+
+
+@patch("app.http_client.get")
+def test_recipe_instructions_passes_etag_through(mock_get, _test_client, test_user):
+    """GET /recipes/<id>/instructions should forward If-None-Match and relay the ML service's 304."""
+    mock_get.return_value.status_code = 304
+    mock_get.return_value.headers = {"ETag": '"abc"', "Cache-Control": "public, max-age=60"}
+
+    res = _test_client.get("/recipes/55/instructions", headers={"If-None-Match": '"abc"'})
+
+    assert res.status_code == 304
+    assert res.headers["ETag"] == '"abc"'
+    assert res.headers["Cache-Control"] == "private, max-age=60"
+    assert mock_get.call_args[0][0].endswith("/recipe/55/instructions")
+    assert mock_get.call_args[1]["headers"] == {"If-None-Match": '"abc"'}
+
+
+@patch("app.http_client.get")
+def test_recipe_instructions_relays_throttling(mock_get, _test_client, test_user):
+    """A 503 from the ML service should reach the browser with its Retry-After, not become a 404."""
+    mock_get.return_value.status_code = 503
+    mock_get.return_value.headers = {"Retry-After": "60"}
+
+    res = _test_client.get("/recipes/55/instructions")
+
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "60"
+
+
+@patch("app.db")
+def test_metrics_and_server_timing(mock_db, _test_client, test_user):
+    """Every response carries Server-Timing, and /metrics exposes request and query histograms."""
+    mock_db.recommendations.find_one.return_value = {"status": "ready"}
+
+    res = _test_client.get("/recommendations/status")
+    assert res.headers["Server-Timing"].startswith("db;dur=")
+    assert "total;dur=" in res.headers["Server-Timing"]
+
+    text = _test_client.get("/metrics").get_data(as_text=True)
+    assert 'http_requests_total{method="GET",route="/recommendations/status",status="200"}' in text
+    assert 'mongo_queries_per_request_count{route="/recommendations/status"}' in text
@@ -0,0 +1,56 @@
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+from bson import ObjectId
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from jobs import refresh_recommendations
+from worker import work
+
+
+@patch("jobs.http_client.post")
+def test_refresh_recommendations_stores_result(mock_post):
+    """The worker should call the ML API with the user's pantry and store the recipes."""
+    db = MagicMock()
+    user_id = ObjectId()
+    db.ingredients.find.return_value = [{"name": "olive oil"}, {"name": "chicken"}]
+    fake_recipes = [{"id": 1, "name": "Turbo Chicken"}]
+    mock_post.return_value.json.return_value = fake_recipes
+    mock_post.return_value.raise_for_status.return_value = None
+
+    assert refresh_recommendations(db, user_id, top_n=3)
+
+    sent = mock_post.call_args[1]["json"]
+    assert sent["ingredients"] == ["olive oil", "chicken"]
+    assert sent["top_n"] == 3
+    assert sent["include_instructions"] is False
+    filt, update = db.recommendations.update_one.call_args[0]
+    assert filt == {"user_id": user_id}
+    assert update["$set"]["recipes"] == fake_recipes
+    assert update["$set"]["status"] == "ready"
+
+
+@patch("jobs.http_client.post")
+def test_refresh_failure_keeps_last_result(mock_post):
+    """A failed refresh should only flag the status, not wipe stored recipes."""
+    db = MagicMock()
+    db.ingredients.find.return_value = []
+    mock_post.side_effect = Exception("ML service down")
+
+    assert not refresh_recommendations(db, ObjectId())
+
+    update = db.recommendations.update_one.call_args[0][1]
+    assert update == {"$set": {"status": "failed"}}
+
+
+@patch("worker.run_job")
+def test_worker_runs_claimed_jobs(mock_run_job):
+    """The worker should run each claimed job until the queue is empty."""
+    db = MagicMock()
+    jobs = [{"_id": 1, "user_id": ObjectId()}, {"_id": 2, "user_id": ObjectId()}, None]
+    db.recommendation_jobs.find_one_and_update.side_effect = jobs
+
+    work(db, once=True)
+
+    assert [c[0][1]["_id"] for c in mock_run_job.call_args_list] == [1, 2]
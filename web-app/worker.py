@@ -0,0 +1,41 @@
+"""Worker process that runs queued recommendation refreshes.
+
+    python worker.py
+"""
+import os
+import time
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from jobs import claim_job, run_job
+from repository import ensure_indexes, migrate_bookmarks
+
+load_dotenv()
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongodb:27017")
+DB_NAME = os.getenv("DB_NAME", "pantry-pal")
+POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1"))
+
+
+def work(db, once=False):
+    while True:
+        job = claim_job(db)
+        if job is None:
+            if once:
+                return
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        try:
+            run_job(db, job)
+        except Exception as e:
+            print(f"Recommendation job {job['_id']} failed: {e}", flush=True)
+
+
+if __name__ == "__main__":
+    db = MongoClient(MONGO_URI)[DB_NAME]
+    ensure_indexes(db)
+    migrate_bookmarks(db)
+    print("Recommendation worker started", flush=True)
+    work(db)